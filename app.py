@@ -1,26 +1,94 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory, url_for, Response, abort, redirect
+from flask import Flask, Request, render_template, request, jsonify, send_from_directory, url_for, Response, abort, redirect, stream_with_context, g
 import numpy as np
+import shapely
 from pathlib import Path
-import uuid
 import dxf2txt
-from dxf2txt import list_shapes, polygon_to_svg, convert_one
+from dxf2txt import load_shapes, load_ingest, convert_one
 import logging
 from xml.etree.ElementTree import Element, SubElement, tostring
-from shapely.ops import unary_union
 from shapely.affinity import rotate as _rotate_geom, scale as _scale_geom
 import config
+import jobs
+import metrics
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, wait
+import contextvars
+import io
+import math
+import os
 import re
+import tempfile
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from svgpathtools import svg2paths2, svg2paths
-from shapely.geometry import Polygon
+from werkzeug.http import remove_entity_headers
+from shapely.geometry import Polygon, MultiPolygon
 
 app = Flask(__name__)
 UPLOAD_FOLDER = Path(app.root_path) / 'uploads'
 UPLOAD_FOLDER.mkdir(exist_ok=True)
 logging.basicConfig(level=logging.DEBUG)
 app.logger.setLevel(logging.DEBUG)
+metrics.enable(config.METRICS_ENABLED)
+dxf2txt.STREAM_DXF = config.DXF_STREAMING
+# Pooled HTTP session shared by every R2 upload, so objects reuse kept-alive
+# TLS connections instead of paying a handshake each
+_r2_session = requests.Session()
+_r2_adapter = HTTPAdapter(pool_connections=config.R2_UPLOAD_WORKERS,
+                          pool_maxsize=config.R2_UPLOAD_WORKERS)
+_r2_session.mount('https://', _r2_adapter)
+_r2_session.mount('http://', _r2_adapter)
+# Bounded pool for concurrent uploads
+_r2_executor = ThreadPoolExecutor(max_workers=config.R2_UPLOAD_WORKERS,
+                                  thread_name_prefix='r2-upload')
+_s3_client = None
+
+def _file_size(fileobj):
+    try:
+        return os.fstat(fileobj.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+class _MultipartFailed(Exception):
+    """The S3 API rejected a multipart upload (bad keys, endpoint, ...)."""
+
+def _r2_multipart_upload(key, fileobj):
+    """Upload a large object through R2's S3 API in concurrent parts."""
+    global _s3_client
+    import boto3
+    from boto3.exceptions import S3UploadFailedError
+    from boto3.s3.transfer import TransferConfig
+    from botocore.exceptions import BotoCoreError, ClientError
+    if _s3_client is None:
+        _s3_client = boto3.client('s3', endpoint_url=config.CLOUDFLARE_R2_ENDPOINT,
+                                  aws_access_key_id=config.R2_ACCESS_KEY_ID,
+                                  aws_secret_access_key=config.R2_SECRET_ACCESS_KEY,
+                                  region_name='auto')
+    transfer = TransferConfig(multipart_threshold=config.R2_MULTIPART_THRESHOLD,
+                              multipart_chunksize=config.R2_MULTIPART_CHUNKSIZE)
+    try:
+        _s3_client.upload_fileobj(fileobj, config.CLOUDFLARE_BUCKET, key, Config=transfer)
+    except (BotoCoreError, ClientError, S3UploadFailedError) as exc:
+        raise _MultipartFailed(exc) from exc
+
 # Helper to upload files to Cloudflare R2 via API
 def r2_upload(key, fileobj):
+    size = _file_size(fileobj)
+    if (config.R2_MULTIPART_ENABLED and size is not None
+            and size >= config.R2_MULTIPART_THRESHOLD):
+        try:
+            app.logger.debug("R2 multipart upload: %s (%d bytes)", key, size)
+            return _r2_multipart_upload(key, fileobj)
+        except ImportError:
+            # boto3 not installed: fall back to a single streamed PUT
+            app.logger.debug("boto3 unavailable, streaming %s in one PUT", key)
+        except _MultipartFailed as exc:
+            app.logger.warning("R2 multipart upload of %s failed (%s), streaming it in one PUT",
+                               key, exc)
+        fileobj.seek(0)
     url = f"{config.CLOUDFLARE_R2_API_BASE}/{key}"
     headers = {"Authorization": f"Bearer {config.CLOUDFLARE_API_TOKEN}"}
     # Set content-type for SVG uploads
@@ -35,13 +103,202 @@ def r2_upload(key, fileobj):
     except Exception:
         fname = None
     app.logger.debug("R2 upload fileobj: %s", fname or repr(fileobj))
-    resp = requests.put(url, data=fileobj, headers=headers)
+    resp = _r2_session.put(url, data=fileobj, headers=headers)
     # Log response headers from R2
     app.logger.debug("R2 upload response headers: %r", resp.headers)
     if not resp.ok:
         app.logger.error("R2 upload failed for %s: %s %s", key, resp.status_code, resp.text)
         resp.raise_for_status()
 
+# R2 keys are content-addressed (the session id is the upload's hash and
+# derived files carry their parameters), so an existing key never needs
+# uploading again.  The most recent R2_KNOWN_KEYS keys seen here are
+# remembered; others cost one authenticated HEAD.
+_r2_known = OrderedDict()
+_r2_known_lock = threading.Lock()
+
+def _r2_remember(key):
+    with _r2_known_lock:
+        _r2_known[key] = True
+        _r2_known.move_to_end(key)
+        while len(_r2_known) > config.R2_KNOWN_KEYS:
+            _r2_known.popitem(last=False)
+
+def r2_exists(key):
+    """True if *key* is known to be on R2 already."""
+    with _r2_known_lock:
+        if key in _r2_known:
+            _r2_known.move_to_end(key)
+            return True
+    try:
+        # the public base may not be public at all (its default is the S3
+        # endpoint), so ask the API the uploads go through
+        resp = _r2_session.head(f"{config.CLOUDFLARE_R2_API_BASE}/{key}", timeout=5,
+                                headers={"Authorization": f"Bearer {config.CLOUDFLARE_API_TOKEN}"})
+    except requests.RequestException:
+        return False
+    if resp.status_code == 200:
+        _r2_remember(key)
+        return True
+    return False
+
+def _r2_skip(key):
+    if r2_exists(key):
+        app.logger.debug("R2 object %s already exists, skipping upload", key)
+        metrics.count('r2_upload_total', result='skipped')
+        return True
+    metrics.count('r2_upload_total', result='uploaded')
+    return False
+
+def _r2_upload_path(key, path):
+    if _r2_skip(key):
+        return
+    with open(path, "rb") as f_obj, metrics.span('r2_upload'):
+        r2_upload(key, f_obj)
+    _r2_remember(key)
+
+def _r2_submit(fn, *args):
+    # run in a copy of the caller's context, so upload spans land in the
+    # request's Server-Timing breakdown
+    return _r2_executor.submit(contextvars.copy_context().run, fn, *args)
+
+def r2_upload_async(key, path):
+    """Queue the upload of the file at *path*; returns a Future."""
+    return _r2_submit(_r2_upload_path, key, str(path))
+
+def _r2_upload_bytes(key, data):
+    if _r2_skip(key):
+        return
+    with metrics.span('r2_upload'):
+        r2_upload(key, io.BytesIO(data))
+    _r2_remember(key)
+
+def r2_upload_bytes_async(key, data):
+    """Queue the upload of in-memory *data*; returns a Future."""
+    return _r2_submit(_r2_upload_bytes, key, data)
+
+def r2_upload_many(items):
+    """Upload (key, path) pairs concurrently and wait for all of them.
+    Re-raises the first failure after every upload has finished."""
+    futures = [r2_upload_async(key, path) for key, path in items]
+    wait(futures)
+    for future in futures:
+        future.result()
+
+# Streaming upload ingestion: the multipart parser writes each uploaded file
+# straight into UPLOAD_FOLDER through an UploadSpool, hashing it on the way,
+# so an upload is read once and then only moved into its session folder
+class UploadSpool:
+    """Writable, seekable sink for one uploaded file.  Tracks the SHA-1 and
+    size of everything written; `keep(dest)` moves the file into place, and
+    closing without keeping deletes it."""
+    def __init__(self):
+        self._file = tempfile.NamedTemporaryFile(dir=UPLOAD_FOLDER, prefix='.upload_',
+                                                 delete=False)
+        self._hash = hashlib.sha1()
+        self.size = 0
+        self.kept = None
+
+    def write(self, data):
+        self._hash.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        # read/readline/seek/tell/flush for werkzeug's FileStorage
+        return getattr(self._file, name)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+    def keep(self, dest):
+        """Close the spool and move it to *dest*; returns the SHA-1."""
+        self._file.close()
+        os.replace(self._file.name, dest)
+        self.kept = Path(dest)
+        return self.hexdigest()
+
+    def close(self):
+        self._file.close()
+        if self.kept is None:
+            try:
+                os.unlink(self._file.name)
+            except FileNotFoundError:
+                pass
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        return UploadSpool()
+
+app.request_class = UploadRequest
+# Enforced while the body streams in, not only against Content-Length
+app.config['MAX_CONTENT_LENGTH'] = config.MAX_UPLOAD_BYTES or None
+
+def upload_digest(file):
+    """SHA-1 of an uploaded file: free when it was spooled, else one pass
+    over the stream."""
+    if isinstance(file.stream, UploadSpool):
+        return file.stream.hexdigest()
+    h = hashlib.sha1()
+    for chunk in iter(lambda: file.stream.read(1 << 20), b''):
+        h.update(chunk)
+    file.stream.seek(0)
+    return h.hexdigest()
+
+def save_upload(file, dest, digest):
+    """Move an uploaded file to *dest* without copying when it was spooled,
+    and seed dxf2txt's digest memo with its known *digest*."""
+    if isinstance(file.stream, UploadSpool):
+        file.stream.keep(dest)
+    else:
+        file.save(str(dest))
+    dxf2txt.remember_digest(str(dest), digest)
+
+# Optional background job mode: heavy routes enqueue their work and return a
+# job id at once instead of holding a worker for the whole conversion
+job_queue = jobs.make_queue(config.JOB_BACKEND, workers=config.JOB_WORKERS,
+                            max_queued=config.JOB_QUEUE_DEPTH,
+                            time_budget=config.JOB_TIME_BUDGET)
+
+def job_mode():
+    """Job mode is on for every request via JOB_MODE, or per request with job=1."""
+    return config.JOB_MODE or bool(request.values.get('job'))
+
+def enqueue(fn, *args, **kwargs):
+    try:
+        job_id = job_queue.submit(fn, *args, **kwargs)
+    except jobs.QueueFull:
+        return jsonify({'error': 'Too many queued conversions, try again shortly'}), 503
+    return jsonify({'job_id': job_id, 'status': 'queued',
+                    'status_url': url_for('job_status', job_id=job_id),
+                    'result_url': url_for('job_result', job_id=job_id)}), 202
+
+# Stage timing: each request collects its dxf2txt/app spans, which go back as
+# a Server-Timing header and into the /metrics histograms
+@app.before_request
+def start_timing():
+    if metrics.enabled:
+        g.request_t0 = time.perf_counter()
+        metrics.begin_request()
+
+@app.after_request
+def finish_timing(response):
+    if metrics.enabled and 'request_t0' in g:
+        total = time.perf_counter() - g.request_t0
+        stages = metrics.end_request()
+        response.headers['Server-Timing'] = metrics.server_timing(stages, total)
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('request_seconds', total, route=route,
+                        method=request.method, status=response.status_code)
+    return response
+
+@app.route('/metrics')
+def metrics_route():
+    if not metrics.enabled:
+        abort(404)
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/')
 def home():
     return render_template('index.html')
@@ -92,6 +349,66 @@ def sizing():
 
     return render_template('sizing_form.html')
 
+def build_previews(session_id, dxf_path, sts10, rows10, units):
+    """Parse an uploaded file and upload one sprite SVG previewing every shape.
+    Returns (template, context) for the shape selection page."""
+    filename = dxf_path.name
+    # Upload original DXF to R2 in the background while we parse it
+    uploads = [r2_upload_async(f"{session_id}/{filename}", dxf_path)]
+    # Determine unit scale (inches→mm or mm→mm)
+    unit_scale = 25.4 if units in ('inch', 'inches') else 1.0
+    app.logger.debug("Using unit scale: %s", unit_scale)
+    # SVG uploads also carry their artboard size from the same (cached) parse;
+    # parse at the gauge's fidelity so /convert_shape and /convert_all reuse it
+    fidelity = dxf2txt.gauge_fidelity(sts10, rows10)
+    shapes, meta = load_ingest(str(dxf_path), wanted_layers=None,
+                               unit_scale=unit_scale, fidelity=fidelity)
+    if not shapes:
+        app.logger.warning("No shapes found for file %s", dxf_path)
+        with metrics.span('r2_wait'):
+            uploads[0].result()
+        return 'convert_result.html', {'links': []}
+    # One sprite with a <symbol> and <view> per shape: the page references
+    # pieces by fragment, so every preview is one object and one request
+    with metrics.span('preview_svg'):
+        sprite, index = dxf2txt.preview_sprite(shapes, lod=config.PREVIEW_LOD)
+    # versioned, so sprites drawn by older preview code are not reused
+    sprite_params = derived_key(preview=PREVIEW_VERSION, fidelity=fidelity.key(),
+                                unit_scale=unit_scale, lod=config.PREVIEW_LOD)
+    sprite_key = f"{session_id}/0_previews_{sprite_params}.svg"
+    uploads.append(r2_upload_bytes_async(sprite_key, sprite))
+    sprite_link = f"{config.CLOUDFLARE_R2_PUBLIC_BASE}/{sprite_key}"
+    art_w_mm = meta.get('width_mm')
+    art_h_mm = meta.get('height_mm')
+    preview_info = []
+    for piece in index:
+        # bounding box in mm
+        if art_w_mm is not None and art_h_mm is not None:
+            width_mm = art_w_mm
+            height_mm = art_h_mm
+        else:
+            width_mm = piece['width']
+            height_mm = piece['height']
+        # convert to display units
+        if units in ('inch', 'inches'):
+            width = width_mm / 25.4
+            height = height_mm / 25.4
+        else:
+            width = width_mm
+            height = height_mm
+        preview_info.append({'idx': piece['idx'], 'name': piece['name'],
+                             'svg_link': f"{sprite_link}#{piece['id']}",
+                             'width': width, 'height': height})
+    # Page latency is the slowest upload, not the sum of all of them
+    with metrics.span('r2_wait'):
+        wait(uploads)
+    for future in uploads:
+        future.result()
+    return 'preview.html', dict(shapes=preview_info, session_id=session_id,
+                                sts10=sts10, rows10=rows10,
+                                unit_scale=unit_scale, units=units,
+                                preview_lod=config.PREVIEW_LOD or '')
+
 @app.route('/convert', methods=['GET', 'POST'])
 def convert_route():
     if request.method == 'POST':
@@ -99,124 +416,121 @@ def convert_route():
         if not file:
             return "No file uploaded", 400
         try:
-            sts10 = float(request.form['sts10'])
-            rows10 = float(request.form['rows10'])
+            sts10, rows10 = form_gauge(request.form)
         except (KeyError, ValueError):
             return "Invalid gauge values", 400
         app.logger.debug("Starting conversion: file=%s, sts10=%s, rows10=%s", file.filename, sts10, rows10)
-        session_id = uuid.uuid4().hex
+        # Sessions are content-addressed: re-uploading a file lands in the
+        # same folder, so its original, parsed shapes and grids are shared
+        digest = upload_digest(file)
+        session_id = digest[:32]
         session_folder = UPLOAD_FOLDER / session_id
-        session_folder.mkdir()
-        dxf_path = session_folder / file.filename
-        file.save(str(dxf_path))
-        app.logger.debug("Saved DXF to %s", dxf_path)
-        # Upload original DXF to R2
-        with open(dxf_path, "rb") as f_obj:
-            r2_upload(f"{session_id}/{file.filename}", f_obj)
-        # Determine unit scale (inches→mm or mm→mm)
+        session_folder.mkdir(exist_ok=True)
+        found = session_input(session_folder, 1.0)
+        if found:
+            dxf_path = Path(found[0])
+            app.logger.debug("Reusing stored upload %s", dxf_path)
+        else:
+            dxf_path = session_folder / file.filename
+            with metrics.span('upload_save'):
+                save_upload(file, dxf_path, digest)
+            app.logger.debug("Saved DXF to %s (sha1 %s)", dxf_path, digest)
         units = request.form.get('units', 'mm')
-        unit_scale = 25.4 if units in ('inch', 'inches') else 1.0
-        app.logger.debug("Using unit scale: %s", unit_scale)
-        # Generate SVG previews for each detected shape
-        shapes = list_shapes(str(dxf_path), wanted_layers=None, unit_scale=unit_scale)
-        if not shapes:
-            app.logger.warning("No shapes found for file %s", dxf_path)
-            return render_template('convert_result.html', links=[])
-        # Parse SVG artboard dimensions if this is an SVG upload
-        art_w_mm = art_h_mm = None
-        if dxf_path.suffix.lower() == '.svg':
-            import xml.etree.ElementTree as ET
-            import re
-            tree = ET.parse(str(dxf_path))
-            root = tree.getroot()
-            # parse viewBox for fallback dimensions
-            vb = root.get('viewBox')
-            view_w = view_h = None
-            if vb:
-                parts = vb.strip().split()
-                if len(parts) == 4:
-                    view_w = float(parts[2]); view_h = float(parts[3])
-            width_attr = root.get('width'); height_attr = root.get('height')
-            def parse_length(s):
-                m = re.match(r'([0-9]*\.?[0-9]+)([a-zA-Z%]*)', s)
-                if not m: return None, None
-                return float(m.group(1)), m.group(2)
-            def to_mm(val, unit):
-                u = unit.lower()
-                # blank unit implies points (Illustrator uses points)
-                if u == '':
-                    return val * 25.4 / 72
-                # explicit point unit
-                if u == 'pt':
-                    return val * 25.4 / 72
-                # inches
-                if u in ('in', 'inch', 'inches'):
-                    return val * 25.4
-                # centimeters
-                if u == 'cm':
-                    return val * 10
-                # millimeters
-                if u == 'mm':
-                    return val
-                # pixels (CSS px at 96 ppi)
-                if u in ('px',):
-                    return val / 96 * 25.4
-                # default fallback treat as pixels
-                return val / 96 * 25.4
-            # try explicit width/height attrs
-            if width_attr:
-                w_val, w_unit = parse_length(width_attr)
-                if w_val is not None: art_w_mm = to_mm(w_val, w_unit)
-            if height_attr:
-                h_val, h_unit = parse_length(height_attr)
-                if h_val is not None: art_h_mm = to_mm(h_val, h_unit)
-            # fallback to viewBox dims interpreted as points
-            if (art_w_mm is None or art_h_mm is None) and view_w is not None and view_h is not None:
-                art_w_mm = view_w * 25.4 / 72; art_h_mm = view_h * 25.4 / 72
-        preview_info = []
-        for idx, (name, poly) in enumerate(shapes, start=1):
-            # compute bounding box in mm
-            if art_w_mm is not None and art_h_mm is not None:
-                width_mm = art_w_mm
-                height_mm = art_h_mm
-            else:
-                minx, miny, maxx, maxy = poly.bounds
-                width_mm = maxx - minx
-                height_mm = maxy - miny
-            # convert to display units
-            if units in ('inch', 'inches'):
-                width = width_mm / 25.4
-                height = height_mm / 25.4
-            else:
-                width = width_mm
-                height = height_mm
-            fname = name.replace(" ", "_")
-            svg_name = f"{idx}_{fname}.svg"
-            svg_path = session_folder / svg_name
-            polygon_to_svg(poly, str(svg_path))
-            # Upload SVG to R2 and set public URL
-            with open(svg_path, "rb") as svg_file:
-                r2_upload(f"{session_id}/{svg_name}", svg_file)
-            link = f"{config.CLOUDFLARE_R2_PUBLIC_BASE}/{session_id}/{svg_name}"
-            preview_info.append({'idx': idx, 'name': name, 'svg_link': link,
-                                 'width': width, 'height': height})
-        return render_template('preview.html', shapes=preview_info,
-                               session_id=session_id, sts10=sts10,
-                               rows10=rows10, unit_scale=unit_scale,
-                               units=units)
+        if job_mode():
+            return enqueue(build_previews, session_id, dxf_path, sts10, rows10, units)
+        template, context = build_previews(session_id, dxf_path, sts10, rows10, units)
+        return render_template(template, **context)
     return render_template('convert.html')
 
+def form_gauge(values):
+    """(sts10, rows10) from request *values*; KeyError/ValueError unless
+    both are given as positive, finite numbers."""
+    sts10, rows10 = float(values['sts10']), float(values['rows10'])
+    if not (0 < sts10 < math.inf and 0 < rows10 < math.inf):
+        raise ValueError(f"gauge must be positive, got {sts10} x {rows10}")
+    return sts10, rows10
+
 @app.route('/uploads/<session_id>/<filename>')
 def uploaded_file(session_id, filename):
     directory = UPLOAD_FOLDER / session_id
     return send_from_directory(str(directory), filename)
 
+def session_input(session_folder, unit_scale):
+    """Return (input_path, geometry_scale) for an upload session, or None.
+    DXF geometry uses the display unit_scale, SVG is already in mm."""
+    dxf_files = list(session_folder.glob('*.dxf'))
+    if dxf_files:
+        return str(dxf_files[0]), unit_scale
+    svg_files = list(session_folder.glob('*.svg'))
+    orig_svgs = [p for p in svg_files if not re.match(r'^\d+_', p.name)]
+    if orig_svgs:
+        return str(orig_svgs[0]), 1.0
+    return None
+
+class ZipStream:
+    """Write-only sink for zipfile; drain() hands back what was written since
+    the last call.  Having no tell()/seek() makes zipfile emit data
+    descriptors, so entries can be streamed as soon as they are complete."""
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def derived_key(**params):
+    """Short name for outputs derived from a session's upload with *params*.
+    The session id is the upload's hash, so together they key the outputs
+    by (content hash, parameters)."""
+    key = '|'.join(f"{name}={params[name]!r}" for name in sorted(params))
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+def dak_key(sts10, rows10, geom_scale, **options):
+    """derived_key of DAK outputs.  Carries the rasterizer version and the
+    gauge's fidelity, so files written by older code are never reused."""
+    return derived_key(sts10=sts10, rows10=rows10, unit_scale=geom_scale,
+                       grid=dxf2txt.GRID_VERSION,
+                       fidelity=dxf2txt.gauge_fidelity(sts10, rows10).key(), **options)
+
+def _existing_dak(out_dir, piece_index):
+    return next(out_dir.glob(f"{piece_index}_*.txt"), None)
+
+def convert_shape_files(session_id, input_path, sts10, rows10, geom_scale,
+                        piece_index, **options):
+    """Convert one piece and upload the TXT; returns (template, context).
+    A piece already converted with the same parameters is served as is."""
+    session_folder = Path(input_path).parent
+    params = dak_key(sts10, rows10, geom_scale, **options)
+    out_dir = session_folder / f"out_{params}"
+    existing = _existing_dak(out_dir, piece_index)
+    created = [str(existing)] if existing else []
+    if not created:
+        out_dir.mkdir(exist_ok=True)
+        # Convert shape using the common converter
+        created = convert_one(input_path, str(out_dir), sts10, rows10,
+                              wanted_layers=None, unit_scale=geom_scale,
+                              piece_index=piece_index, cache=True, **options)
+    if not created:
+        raise LookupError("Shape not found")
+    # Upload converted files to R2 and build public URLs
+    keys = [f"{session_id}/{params}/{Path(p).name}" for p in created]
+    r2_upload_many(zip(keys, created))
+    links = [f"{config.CLOUDFLARE_R2_PUBLIC_BASE}/{key}" for key in keys]
+    return 'convert_result.html', {'links': links}
+
 @app.route('/convert_shape', methods=['POST'])
 def convert_shape():
     session_id = request.form.get('session_id')
     try:
-        sts10 = float(request.form['sts10'])
-        rows10 = float(request.form['rows10'])
+        sts10, rows10 = form_gauge(request.form)
         unit_scale = float(request.form['unit_scale'])
         piece_index = int(request.form['piece_index'])
         rotation = float(request.form.get('rotation', 0))
@@ -228,67 +542,196 @@ def convert_shape():
     except (KeyError, ValueError):
         return "Invalid parameters", 400
     session_folder = UPLOAD_FOLDER / session_id
-    # Determine input file and geometry scale (DXF: display unit_scale, SVG: mm)
-    dxf_files = list(session_folder.glob('*.dxf'))
-    if dxf_files:
-        input_path = str(dxf_files[0])
-        geom_scale = unit_scale
-    else:
-        svg_files = list(session_folder.glob('*.svg'))
-        orig_svgs = [p for p in svg_files if not re.match(r'^\d+_', p.name)]
-        if orig_svgs:
-            input_path = str(orig_svgs[0])
-            geom_scale = 1.0
+    found = session_input(session_folder, unit_scale)
+    if not found:
+        return "Input file not found", 404
+    input_path, geom_scale = found
+    args = (session_id, input_path, sts10, rows10, geom_scale, piece_index)
+    options = dict(rotation=rotation, mirror=mirror, garter_mode=garter_mode,
+                   add_transfers=add_transfers, full_cardigan=full_cardigan,
+                   half_cardigan=half_cardigan)
+    if job_mode():
+        return enqueue(convert_shape_files, *args, **options)
+    try:
+        template, context = convert_shape_files(*args, **options)
+    except LookupError as exc:
+        return str(exc), 404
+    return render_template(template, **context)
+
+def convert_many_files(input_path, out_dir, sts10, rows10, geom_scale,
+                       piece_indices=None, **options):
+    """`dxf2txt.convert_many` over *out_dir*, serving pieces already
+    converted there as they are and converting only the rest.  Yields
+    (piece_index, name, txt_path, error) in piece order."""
+    if piece_indices is None:
+        shapes = load_shapes(input_path, wanted_layers=None, unit_scale=geom_scale,
+                             fidelity=dxf2txt.gauge_fidelity(sts10, rows10))
+        piece_indices = range(1, len(shapes) + 1)
+    existing = {i: _existing_dak(out_dir, i) for i in dict.fromkeys(piece_indices)}
+    missing = [i for i, path in existing.items() if path is None]
+    converted = dxf2txt.convert_many(input_path, str(out_dir), sts10, rows10,
+                                     piece_indices=missing, unit_scale=geom_scale,
+                                     cache=True, **options)
+    for piece_index, path in existing.items():
+        if path is None:
+            yield next(converted)
         else:
-            return "Input file not found", 404
-    # Convert shape using the common converter
-    created = convert_one(input_path, str(session_folder), sts10, rows10,
-                          wanted_layers=None, unit_scale=geom_scale,
-                          piece_index=piece_index,
-                          rotation=rotation, mirror=mirror,
-                          garter_mode=garter_mode, add_transfers=add_transfers,
-                          full_cardigan=full_cardigan, half_cardigan=half_cardigan)
-    if not created:
-        return "Shape not found", 404
-    # Upload converted files to R2 and build public URLs
-    links = []
-    for p in created:
-        filename = Path(p).name
-        with open(p, "rb") as f_obj:
-            r2_upload(f"{session_id}/{filename}", f_obj)
-        link = f"{config.CLOUDFLARE_R2_PUBLIC_BASE}/{session_id}/{filename}"
-        links.append(link)
-    return render_template('convert_result.html', links=links)
+            yield piece_index, path.stem.split('_', 1)[1], str(path), None
 
-@app.route('/preview_shape')
-def preview_shape():
-    import re
-    # Dynamic SVG preview for a single shape with rotation and mirror union
-    session_id = request.args.get('session_id')
+@app.route('/convert_all', methods=['POST'])
+def convert_all():
+    # Convert every piece (or the chosen `pieces`) with shared settings and
+    # stream a ZIP of the DAK files back as each piece finishes
+    session_id = request.form.get('session_id')
     try:
-        piece_index = int(request.args.get('piece_index', 0))
-        rotation = float(request.args.get('rotation', 0))
-        mirror = request.args.get('mirror', 'none')
-        unit_scale = float(request.args.get('unit_scale', 1.0))
-    except (TypeError, ValueError):
-        abort(400, 'Invalid parameters')
+        sts10, rows10 = form_gauge(request.form)
+        unit_scale = float(request.form['unit_scale'])
+        rotation = float(request.form.get('rotation', 0))
+        mirror = request.form.get('mirror', 'none')
+        garter_mode = bool(request.form.get('garter'))
+        add_transfers = bool(request.form.get('transfers'))
+        full_cardigan = bool(request.form.get('cardigan'))
+        half_cardigan = bool(request.form.get('half_cardigan'))
+        # `pieces` may be repeated or comma separated; empty means all
+        piece_indices = [int(p) for value in request.form.getlist('pieces')
+                         for p in value.split(',') if p.strip()] or None
+    except (KeyError, ValueError):
+        return "Invalid parameters", 400
+    if not session_id:
+        return "Invalid parameters", 400
     session_folder = UPLOAD_FOLDER / session_id
-    # If no DXF but an original SVG was uploaded, serve it directly
-    svg_files = list(session_folder.glob('*.svg'))
-    # Filter out generated polygon previews (which start with digits+_)
-    orig_svgs = [p for p in svg_files if not re.match(r'^\d+_', p.name)]
-    if orig_svgs and not list(session_folder.glob('*.dxf')):
-        # Redirect to the SVG hosted on R2 via custom domain
-        orig_url = f"{config.CLOUDFLARE_R2_PUBLIC_BASE}/{session_id}/{orig_svgs[0].name}"
-        new_url = orig_url.replace(config.CLOUDFLARE_R2_PUBLIC_BASE, 'https://kniterate.lunote.co')
-        return redirect(new_url)
-    dxf_files = list(session_folder.glob('*.dxf'))
-    if not dxf_files:
-        abort(404, 'DXF file not found')
-    dxf_path = str(dxf_files[0])
-    shapes = list_shapes(dxf_path, wanted_layers=None, unit_scale=unit_scale)
+    found = session_input(session_folder, unit_scale) if session_folder.is_dir() else None
+    if not found:
+        return "Input file not found", 404
+    input_path, geom_scale = found
+    options = dict(rotation=rotation, mirror=mirror, garter_mode=garter_mode,
+                   add_transfers=add_transfers, full_cardigan=full_cardigan,
+                   half_cardigan=half_cardigan)
+    # same per-parameter folder as /convert_shape, so concurrent requests
+    # with other settings never overwrite the files being zipped
+    out_dir = session_folder / f"out_{dak_key(sts10, rows10, geom_scale, **options)}"
+    out_dir.mkdir(exist_ok=True)
+    results = convert_many_files(input_path, out_dir, sts10, rows10, geom_scale,
+                                 piece_indices, **options)
+
+    def generate():
+        import zipfile
+        sink = ZipStream()
+        failed = []
+        with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            for piece_index, name, txt_path, error in results:
+                if error:
+                    app.logger.warning("convert_all: piece %s skipped: %s", piece_index, error)
+                    failed.append(f"piece {piece_index}" + (f" ({name})" if name else "")
+                                  + f": {error}\n")
+                    continue
+                zf.write(txt_path, arcname=Path(txt_path).name)
+                yield sink.drain()
+            # say which pieces are missing from the archive, and why
+            if failed:
+                zf.writestr('errors.txt', ''.join(failed))
+        yield sink.drain()
+
+    stem = Path(input_path).stem.replace(' ', '_')
+    return Response(stream_with_context(generate()), mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename="{stem}_dak.zip"'})
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_queue.status(job_id)
+    if job is None:
+        abort(404, 'Job not found')
+    info = {k: job[k] for k in ('id', 'status', 'error', 'submitted', 'started', 'finished', 'stages')}
+    if job['status'] == 'done':
+        info['result_url'] = url_for('job_result', job_id=job_id)
+    return jsonify(info)
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = job_queue.status(job_id)
+    if job is None:
+        abort(404, 'Job not found')
+    if job['status'] in ('queued', 'running'):
+        return jsonify({'id': job_id, 'status': job['status']}), 202
+    if job['status'] == 'timeout':
+        return job['error'], 504
+    if job['status'] == 'failed':
+        return job['error'], 500
+    template, context = job['result']
+    return render_template(template, **context)
+
+# Rendered /preview_shape bodies, keyed by their ETag.  Bounded by total size;
+# entries pushed out of memory spill to the session folder on disk.
+PREVIEW_VERSION = 3     # bump when the preview rendering changes
+_preview_lru = OrderedDict()
+_preview_bytes = 0
+_preview_lock = threading.Lock()
+
+def _preview_spill_path(session_folder, etag):
+    return session_folder / f"preview_{etag}.bin"
+
+def preview_cache_get(session_folder, etag):
+    """Return (body, mimetype) from memory or the disk spill, else None."""
+    with _preview_lock:
+        hit = _preview_lru.get(etag)
+        if hit is not None:
+            _preview_lru.move_to_end(etag)
+            return hit[1:]
+    try:
+        data = _preview_spill_path(session_folder, etag).read_bytes()
+    except OSError:
+        return None
+    mimetype, _, body = data.partition(b'\n')
+    mimetype = mimetype.decode()
+    # back into memory: it is in use again
+    preview_cache_put(session_folder, etag, body, mimetype)
+    return body, mimetype
+
+def preview_cache_put(session_folder, etag, body, mimetype):
+    global _preview_bytes
+    spilled = []
+    with _preview_lock:
+        if etag in _preview_lru:
+            return
+        _preview_lru[etag] = (session_folder, body, mimetype)
+        _preview_bytes += len(body)
+        while _preview_bytes > config.PREVIEW_CACHE_BYTES and len(_preview_lru) > 1:
+            old_etag, entry = _preview_lru.popitem(last=False)
+            _preview_bytes -= len(entry[1])
+            spilled.append((old_etag, entry))
+    for old_etag, (folder, old_body, old_type) in spilled:
+        try:
+            _preview_spill_path(folder, old_etag).write_bytes(old_type.encode() + b'\n' + old_body)
+        except OSError as exc:
+            app.logger.warning("Could not spill preview %s: %s", old_etag, exc)
+
+def preview_etag(dxf_path, piece_index, rotation, mirror, unit_scale, as_json, lod,
+                 fidelity=dxf2txt.Fidelity()):
+    """Strong validator: same input bytes + parameters give the same body."""
+    key = (f"{PREVIEW_VERSION}|{dxf2txt.file_digest(dxf_path)}|{piece_index}|"
+           f"{rotation!r}|{mirror}|{unit_scale!r}|{int(as_json)}|{lod}|"
+           f"{fidelity.key()}")
+    return hashlib.sha1(key.encode()).hexdigest()
+
+def preview_response(body, mimetype, etag, status=200):
+    resp = Response(body, status=status, mimetype=mimetype)
+    resp.set_etag(etag)
+    resp.cache_control.public = True
+    resp.cache_control.max_age = config.PREVIEW_MAX_AGE
+    if status == 304:
+        # validators only: no body, so no Content-Type/Length either
+        remove_entity_headers(resp.headers)
+    return resp
+
+def render_preview(dxf_path, piece_index, rotation, mirror, unit_scale, as_json,
+                   lod=None, fidelity=dxf2txt.Fidelity()):
+    """Render one piece's preview; returns (body, mimetype).
+    *lod* simplifies the outline for display that many pixels across.
+    Raises LookupError when the piece does not exist."""
+    shapes = load_shapes(dxf_path, wanted_layers=None, unit_scale=unit_scale,
+                         fidelity=fidelity)
     if piece_index < 1 or piece_index > len(shapes):
-        abort(404, 'Shape not found')
+        raise LookupError('Shape not found')
     name, base_poly = shapes[piece_index - 1]
     # Apply rotation
     minx, miny, maxx, maxy = base_poly.bounds
@@ -305,9 +748,9 @@ def preview_shape():
         cy = (miny2 + maxy2) / 2
         origin = (minx2, cy) if mirror == 'left' else (maxx2, cy)
         mirrored = _scale_geom(rotated, xfact=-1, yfact=1, origin=origin)
-        # Union rotated and mirrored shapes and close small gaps
-        poly_raw = unary_union([rotated, mirrored])
-        poly_final = poly_raw.buffer(dxf2txt.TOL).buffer(-dxf2txt.TOL)
+        # The halves only meet along the mirror axis, so they are drawn as
+        # subpaths of one even-odd path instead of being unioned and healed
+        poly_final = MultiPolygon(list(shapely.get_parts([rotated, mirrored])))
     else:
         poly_final = rotated
     # Build SVG document and compute dimensions
@@ -326,31 +769,80 @@ def preview_shape():
     svg = Element('svg', xmlns='http://www.w3.org/2000/svg',
                   viewBox=f"{view_minx} {view_miny} {width_mm} {height_mm}",
                   width=f"{width_mm}mm", height=f"{height_mm}mm")
-    # Create path(s) for polygon or multi-polygon boundary
-    if hasattr(poly_final, 'geoms'):
-        polys_out = poly_final.geoms
-    else:
-        polys_out = [poly_final]
-    for p in polys_out:
-        # Render exterior boundary as filled shape
-        coords = ' '.join(f"{x:.3f},{y:.3f}" for x, y in p.exterior.coords)
-        SubElement(svg, 'path', d=f"M {coords} Z", stroke='none', fill='black')
-        # Render interior holes to remove fill where appropriate
-        for interior in p.interiors:
-            hole_coords = ' '.join(f"{x:.3f},{y:.3f}" for x, y in interior.coords)
-            SubElement(svg, 'path', d=f"M {hole_coords} Z", stroke='none', fill='white')
+    # One compact path for polygon or multi-polygon; holes via even-odd fill
+    path = SubElement(svg, 'path', d=dxf2txt.svg_path_data(poly_final, lod),
+                      stroke='none', fill='black')
+    path.set('fill-rule', 'evenodd')
     # Serialize SVG
     svg_bytes = tostring(svg)
     # Return JSON with svg and dims if requested, else raw SVG
-    if request.args.get('json'):
+    if as_json:
         svg_text = svg_bytes.decode('utf-8')
         return jsonify({
             'svg': svg_text,
             'width': round(disp_width, 4),
             'height': round(disp_height, 4),
             'units': disp_units
-        })
-    return Response(svg_bytes, mimetype='image/svg+xml')
+        }).get_data(), 'application/json'
+    return svg_bytes, 'image/svg+xml'
+
+
+@app.route('/preview_shape')
+def preview_shape():
+    import re
+    # Dynamic SVG preview for a single shape with rotation and mirror union
+    session_id = request.args.get('session_id')
+    try:
+        piece_index = int(request.args.get('piece_index', 0))
+        rotation = float(request.args.get('rotation', 0))
+        mirror = request.args.get('mirror', 'none')
+        unit_scale = float(request.args.get('unit_scale', 1.0))
+        # optional level of detail: target preview width in pixels
+        lod = int(request.args['lod']) if request.args.get('lod') else None
+        # optional gauge: parse at the same fidelity as the conversion
+        sts10 = float(request.args.get('sts10') or 0)
+        rows10 = float(request.args.get('rows10') or 0)
+    except (TypeError, ValueError):
+        abort(400, 'Invalid parameters')
+    if (lod is not None and lod < 1) or not (0 <= sts10 < math.inf and 0 <= rows10 < math.inf):
+        abort(400, 'Invalid parameters')
+    if sts10 and rows10:
+        fidelity = dxf2txt.gauge_fidelity(sts10, rows10)
+    else:
+        fidelity = dxf2txt.Fidelity()
+    as_json = bool(request.args.get('json'))
+    session_folder = UPLOAD_FOLDER / session_id
+    # If no DXF but an original SVG was uploaded, serve it directly
+    svg_files = list(session_folder.glob('*.svg'))
+    # Filter out generated polygon previews (which start with digits+_)
+    orig_svgs = [p for p in svg_files if not re.match(r'^\d+_', p.name)]
+    if orig_svgs and not list(session_folder.glob('*.dxf')):
+        # Redirect to the SVG hosted on R2 via custom domain
+        orig_url = f"{config.CLOUDFLARE_R2_PUBLIC_BASE}/{session_id}/{orig_svgs[0].name}"
+        new_url = orig_url.replace(config.CLOUDFLARE_R2_PUBLIC_BASE, 'https://kniterate.lunote.co')
+        return redirect(new_url)
+    dxf_files = list(session_folder.glob('*.dxf'))
+    if not dxf_files:
+        abort(404, 'DXF file not found')
+    dxf_path = str(dxf_files[0])
+    etag = preview_etag(dxf_path, piece_index, rotation, mirror, unit_scale,
+                        as_json, lod, fidelity)
+    # Conditional GET: answer repeats without touching the geometry
+    if request.if_none_match.contains_weak(etag):
+        return preview_response(b'', None, etag, status=304)
+    cached = preview_cache_get(session_folder, etag)
+    if cached is None:
+        try:
+            with metrics.span('render_preview'):
+                body, mimetype = render_preview(dxf_path, piece_index, rotation,
+                                                mirror, unit_scale, as_json, lod,
+                                                fidelity)
+        except LookupError:
+            abort(404, 'Shape not found')
+        preview_cache_put(session_folder, etag, body, mimetype)
+    else:
+        body, mimetype = cached
+    return preview_response(body, mimetype, etag)
 
 if __name__ == '__main__':
     app.run(debug=True)
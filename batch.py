@@ -0,0 +1,198 @@
+"""batch.py – convert whole directories of DXF/SVG markers at several gauges.
+
+    python batch.py markers/ 'archive/**/*.dxf' --gauge 28x40 --gauge 5x7 \
+        --out dak/ --workers 4
+
+Every (file, gauge) pair is one task for a process pool.  Outputs land in
+``<out>/<stem>_<hash>/<sts10>x<rows10>/`` and a JSON manifest records the
+outputs and timing of every task.  A task whose input content hash and
+parameters match an entry in the skip cache (``<out>/.cache`` by default) and
+whose outputs still exist is not converted again.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import dxf2txt
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1       # bump when the DAK writer changes (rasterizing: GRID_VERSION)
+SUFFIXES = ('.dxf', '.svg')
+
+
+def parse_gauge(text):
+    """'28x40' -> (28.0, 40.0)."""
+    try:
+        sts10, rows10 = (float(v) for v in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected STS10xROWS10, got {text!r}")
+    if sts10 <= 0 or rows10 <= 0:
+        raise argparse.ArgumentTypeError(f"gauge must be positive, got {text!r}")
+    return sts10, rows10
+
+
+def find_inputs(patterns):
+    """Expand directories (searched recursively) and globs into a sorted,
+    de-duplicated list of DXF/SVG files."""
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths = Path(pattern).rglob('*')
+        else:
+            paths = map(Path, glob.glob(pattern, recursive=True))
+        found.update(p.resolve() for p in paths
+                     if p.is_file() and p.suffix.lower() in SUFFIXES)
+    return sorted(found)
+
+
+def _gauge_label(sts10, rows10):
+    return f"{sts10:g}x{rows10:g}"
+
+
+def cache_key(digest, sts10, rows10, unit_scale, layers):
+    # the rasterizer version and the gauge's tolerances change the output too
+    fidelity = dxf2txt.gauge_fidelity(sts10, rows10).key()
+    params = (f"{CACHE_VERSION}|{dxf2txt.GRID_VERSION}|{fidelity}|{digest}|"
+              f"{float(sts10)!r}|{float(rows10)!r}|"
+              f"{float(unit_scale)!r}|{','.join(sorted(layers or ()))}")
+    return hashlib.sha1(params.encode()).hexdigest()
+
+
+def _cached(cache_dir, key):
+    """The cached task record for *key* if every output is still there."""
+    try:
+        record = json.loads((cache_dir / f"{key}.json").read_text())
+    except (OSError, ValueError):
+        return None
+    if all(os.path.exists(p) for p in record['outputs']):
+        return record
+    return None
+
+
+def _convert_task(task):
+    """Pool worker: convert one file at one gauge.  Never raises, so one
+    broken marker cannot abort the batch; a file with any failed piece is
+    an error, keeping the pieces that were written."""
+    path, out_dir, sts10, rows10, unit_scale, layers = task
+    t0 = time.perf_counter()
+    try:
+        outputs = dxf2txt.convert(path, out_dir, sts10, rows10, wanted_layers=layers,
+                                  unit_scale=unit_scale, strict=True)
+        error = None
+    except dxf2txt.PartialConversion as exc:
+        outputs, error = exc.created, str(exc)
+    except Exception as exc:
+        outputs, error = [], f"{type(exc).__name__}: {exc}"
+    return {'outputs': outputs, 'seconds': time.perf_counter() - t0, 'error': error}
+
+
+def run_batch(inputs, gauges, out_dir, cache_dir=None, workers=None,
+              unit_scale=1.0, layers=None, force=False):
+    """Convert every input at every gauge; returns the manifest dict."""
+    out_dir = Path(out_dir)
+    cache_dir = Path(cache_dir) if cache_dir else out_dir / '.cache'
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    layers = sorted(l.upper().strip() for l in layers) if layers else None
+    t0 = time.perf_counter()
+    entries, pending = [], {}
+    for path in inputs:
+        digest = dxf2txt.file_digest(path)
+        for sts10, rows10 in gauges:
+            key = cache_key(digest, sts10, rows10, unit_scale, layers)
+            entry = {'input': str(path), 'sha1': digest, 'sts10': sts10,
+                     'rows10': rows10, 'key': key}
+            entries.append(entry)
+            if key in pending:
+                # same bytes at another path, or a repeated gauge: convert once
+                pending[key][0].append(entry)
+                continue
+            hit = None if force else _cached(cache_dir, key)
+            if hit is not None:
+                entry.update(status='cached', outputs=hit['outputs'], seconds=0.0,
+                             converted_seconds=hit['seconds'])
+                continue
+            target = out_dir / f"{path.stem}_{digest[:8]}" / _gauge_label(sts10, rows10)
+            pending[key] = ([entry], (str(path), str(target), sts10, rows10,
+                                      unit_scale, layers))
+    waiting = sum(len(group) for group, _ in pending.values())
+    logger.info("%d task(s): %d cached, %d duplicate, %d to convert", len(entries),
+                len(entries) - waiting, waiting - len(pending), len(pending))
+    if pending:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+            futures = {pool.submit(_convert_task, task): key
+                       for key, (_, task) in pending.items()}
+            for future in as_completed(futures):
+                key = futures[future]
+                entry, *duplicates = pending[key][0]
+                result = future.result()
+                entry.update(result, status='failed' if result['error'] else 'converted')
+                for dup in duplicates:
+                    dup.update(outputs=result['outputs'], seconds=0.0,
+                               converted_seconds=result['seconds'], error=result['error'],
+                               status='failed' if result['error'] else 'cached')
+                if result['error']:
+                    logger.error("%s @ %s failed: %s", entry['input'],
+                                 _gauge_label(entry['sts10'], entry['rows10']), result['error'])
+                    continue
+                logger.info("%s @ %s: %d file(s) in %.2fs", entry['input'],
+                            _gauge_label(entry['sts10'], entry['rows10']),
+                            len(result['outputs']), result['seconds'])
+                (cache_dir / f"{key}.json").write_text(json.dumps(
+                    {'outputs': result['outputs'], 'seconds': result['seconds']}))
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'gauges': [list(g) for g in gauges],
+        'unit_scale': unit_scale, 'layers': layers,
+        'seconds': time.perf_counter() - t0,
+        'counts': {status: sum(e['status'] == status for e in entries)
+                   for status in ('converted', 'cached', 'failed')},
+        'entries': entries,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('inputs', nargs='+', help='DXF/SVG files, directories or globs')
+    parser.add_argument('--gauge', dest='gauges', action='append', type=parse_gauge,
+                        required=True, metavar='STS10xROWS10',
+                        help='stitches x rows per 10 cm; repeat for a gauge matrix')
+    parser.add_argument('--out', default='dak', help='output directory (default: dak)')
+    parser.add_argument('--manifest', help='JSON manifest path (default: <out>/manifest.json)')
+    parser.add_argument('--cache', help='skip-cache directory (default: <out>/.cache)')
+    parser.add_argument('--workers', type=int, help='worker processes (default: CPU count)')
+    parser.add_argument('--units', choices=('mm', 'inch'), default='mm',
+                        help='DXF drawing units (SVG carries its own)')
+    parser.add_argument('--layer', dest='layers', action='append',
+                        help='only convert these layers/piece names; repeatable')
+    parser.add_argument('--force', action='store_true', help='ignore the skip cache')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    # per-piece logs from the converter would drown the batch progress
+    for name in ('dxf2txt', 'ezdxf'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    inputs = find_inputs(args.inputs)
+    if not inputs:
+        parser.error('no DXF/SVG files matched')
+    manifest = run_batch(inputs, args.gauges, args.out, args.cache, args.workers,
+                         unit_scale=25.4 if args.units == 'inch' else 1.0,
+                         layers=args.layers, force=args.force)
+    manifest_path = Path(args.manifest or Path(args.out) / 'manifest.json')
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+    logger.info("%(converted)d converted, %(cached)d cached, %(failed)d failed",
+                manifest['counts'])
+    logger.info("Manifest written to %s", manifest_path)
+    return 1 if manifest['counts']['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
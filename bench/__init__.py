@@ -0,0 +1,2 @@
+"""Benchmarks for the DXF/SVG → DAK pipeline on a synthetic corpus.
+See bench/run.py for usage."""
@@ -0,0 +1,209 @@
+"""bench/corpus.py – synthetic garment inputs at controlled scale.
+
+Every generator is deterministic for a given *seed* and writes one file:
+
+- `gerber_dxf`   – pieces drawn as LINE/ARC chains spread over many layers,
+  the way Gerber/Lectra exports arrive
+- `block_dxf`    – named pieces inside blocks, placed by rotated, scaled and
+  mirrored INSERTs, with notch blocks nested *nesting* levels deep
+- `curves_dxf`   – closed SPLINEs, HATCH boundaries (polyline paths with
+  bulges and edge paths), CIRCLEs and ELLIPSEs
+- `illustrator_svg` – Illustrator-style SVG with a viewBox, width/height in
+  a chosen unit and relative cubic paths with holes
+
+`build_corpus(out_dir, scale)` writes the whole set for one SCALES preset.
+"""
+import math
+import random
+from pathlib import Path
+
+import ezdxf
+
+SCALES = {
+    'small':  dict(pieces=8, points=40, layers=4, blocks=4, inserts=8,
+                   nesting=2, curves=8, svg_paths=8),
+    'medium': dict(pieces=40, points=120, layers=12, blocks=12, inserts=60,
+                   nesting=3, curves=40, svg_paths=40),
+    'large':  dict(pieces=200, points=400, layers=40, blocks=40, inserts=400,
+                   nesting=4, curves=200, svg_paths=200),
+}
+
+
+def garment_outline(cx, cy, width, height, points, rng):
+    """Closed bodice-like outline: straight side seams, a curved armhole and
+    neckline, about *points* vertices, slightly jittered."""
+    n_arm = max(2, points // 3)
+    n_neck = max(2, points - n_arm - 4)
+    pts = [(cx, cy), (cx + width, cy), (cx + width, cy + height * 0.6)]
+    for i in range(1, n_arm):
+        a = math.pi * i / (2 * n_arm)
+        pts.append((cx + width - 0.25 * width * math.sin(a),
+                    cy + height * 0.6 + 0.2 * height * (1 - math.cos(a))))
+    pts.append((cx + width * 0.75, cy + height))
+    pts.append((cx + width * 0.55, cy + height))
+    for i in range(1, n_neck):
+        a = math.pi * i / (2 * n_neck)
+        pts.append((cx + width * 0.55 - 0.3 * width * math.sin(a),
+                    cy + height - 0.15 * height * math.sin(a)))
+    pts.append((cx, cy + height * 0.85))
+    jitter = width * 1e-3
+    return [(x + rng.uniform(-jitter, jitter), y + rng.uniform(-jitter, jitter))
+            for x, y in pts]
+
+
+def _grid(i, pitch):
+    return (i % 10) * pitch, (i // 10) * pitch
+
+
+def gerber_dxf(path, pieces=8, points=40, layers=4, seed=0):
+    """Pieces as rounded rectangles of LINEs and 90° ARCs, each side split
+    into *points* / 4 segments, spread over *layers* layers."""
+    rng = random.Random(seed)
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+    per_side = max(1, points // 4)
+    for i in range(pieces):
+        attribs = {'layer': f"PIECE_{i % layers}"}
+        x0, y0 = _grid(i, 800)
+        w, h = rng.uniform(200, 500), rng.uniform(300, 700)
+        r = min(w, h) * rng.uniform(0.05, 0.2)
+        # corners: (arc centre, start angle); sides run between arcs
+        corners = [((x0 + w - r, y0 + r), 270), ((x0 + w - r, y0 + h - r), 0),
+                   ((x0 + r, y0 + h - r), 90), ((x0 + r, y0 + r), 180)]
+        for k, ((cx, cy), start) in enumerate(corners):
+            msp.add_arc((cx, cy), r, start, start + 90, dxfattribs=attribs)
+            # straight side from the end of this arc to the start of the next
+            a_end = math.radians(start + 90)
+            (nx, ny), nstart = corners[(k + 1) % 4]
+            p = (cx + r * math.cos(a_end), cy + r * math.sin(a_end))
+            q = (nx + r * math.cos(math.radians(nstart)),
+                 ny + r * math.sin(math.radians(nstart)))
+            for j in range(per_side):
+                a = (p[0] + (q[0] - p[0]) * j / per_side, p[1] + (q[1] - p[1]) * j / per_side)
+                b = (p[0] + (q[0] - p[0]) * (j + 1) / per_side,
+                     p[1] + (q[1] - p[1]) * (j + 1) / per_side)
+                msp.add_line(a, b, dxfattribs=attribs)
+    doc.saveas(path)
+    return Path(path)
+
+
+def block_dxf(path, blocks=4, inserts=8, nesting=2, points=40, seed=0):
+    """Named pieces in blocks, INSERTed *inserts* times in total with varied
+    rotation, scale and mirroring; each piece block nests a chain of notch
+    blocks *nesting* levels deep."""
+    rng = random.Random(seed)
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+    # innermost notch block first so every level can reference the next
+    inner = None
+    for level in range(nesting, 0, -1):
+        notch = doc.blocks.new(f"NOTCH_{level}")
+        notch.add_lwpolyline([(0, 0), (4, 0), (2, 6)], close=True)
+        if inner is not None:
+            notch.add_blockref(inner, (10, 0))
+        inner = notch.name
+    for b in range(blocks):
+        blk = doc.blocks.new(f"PIECE_{b}")
+        blk.add_lwpolyline(garment_outline(0, 0, rng.uniform(200, 400),
+                                           rng.uniform(300, 600), points, rng),
+                           close=True)
+        blk.add_text(f"Piece Name: Piece {b}")
+        if inner is not None:
+            blk.add_blockref(inner, (50, 50))
+    for i in range(inserts):
+        x, y = _grid(i, 900)
+        msp.add_blockref(f"PIECE_{i % blocks}", (x, y), dxfattribs={
+            'rotation': rng.choice((0, 15, 90, 180)),
+            'xscale': rng.choice((1, 1, -1)) * rng.uniform(0.8, 1.2),
+            'yscale': rng.uniform(0.8, 1.2),
+        })
+    doc.saveas(path)
+    return Path(path)
+
+
+def curves_dxf(path, curves=8, layers=4, seed=0):
+    """Closed SPLINEs, HATCH boundaries, CIRCLEs and ELLIPSEs in equal
+    measure over *layers* layers."""
+    rng = random.Random(seed)
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+    for i in range(curves):
+        attribs = {'layer': f"CURVE_{i % layers}"}
+        x, y = _grid(i, 600)
+        kind = i % 4
+        if kind == 0:
+            fit = [(x + 200 * math.cos(t) * rng.uniform(0.9, 1.1),
+                    y + 250 * math.sin(t) * rng.uniform(0.9, 1.1))
+                   for t in (k * 2 * math.pi / 12 for k in range(12))]
+            msp.add_spline(fit + fit[:1], dxfattribs=attribs)
+        elif kind == 1:
+            hatch = msp.add_hatch(dxfattribs=attribs)
+            if i % 8 == 1:
+                # polyline path with a bulged (arc) side: (x, y, bulge)
+                hatch.paths.add_polyline_path(
+                    [(x, y, 0), (x + 300, y, 0.4), (x + 300, y + 400, 0), (x, y + 400, 0)],
+                    is_closed=True)
+            else:
+                edges = hatch.paths.add_edge_path()
+                edges.add_line((x, y), (x + 300, y))
+                edges.add_arc((x + 300, y + 150), 150, -90, 90)
+                edges.add_line((x + 300, y + 300), (x, y + 300))
+                edges.add_line((x, y + 300), (x, y))
+        elif kind == 2:
+            msp.add_circle((x + 200, y + 200), rng.uniform(50, 200), dxfattribs=attribs)
+        else:
+            msp.add_ellipse((x + 200, y + 200), major_axis=(rng.uniform(100, 250), 0),
+                            ratio=rng.uniform(0.3, 0.9), dxfattribs=attribs)
+    doc.saveas(path)
+    return Path(path)
+
+
+def _svg_piece(x, y, w, h, rng):
+    """Relative-command path data for one piece with a curved top and a hole."""
+    c = rng.uniform(0.2, 0.4) * h
+    outer = (f"M{x:.3f},{y:.3f}h{w:.3f}v{h:.3f}"
+             f"c{-w * 0.2:.3f},{c:.3f} {-w * 0.8:.3f},{c:.3f} {-w:.3f},0z")
+    hx, hy = x + w * 0.4, y + h * 0.4
+    hole = (f"M{hx:.3f},{hy:.3f}q{w * 0.1:.3f},{-h * 0.1:.3f} {w * 0.2:.3f},0"
+            f"s{w * 0.1:.3f},{h * 0.2:.3f} {-w * 0.1:.3f},{h * 0.2:.3f}z")
+    return outer + hole
+
+
+def illustrator_svg(path, paths=8, unit='pt', seed=0):
+    """Illustrator-style SVG: viewBox in points, width/height in *unit*."""
+    rng = random.Random(seed)
+    cols = 10
+    view_w, view_h = cols * 120.0, max(1, math.ceil(paths / cols)) * 160.0
+    factor = {'pt': 1.0, 'px': 96 / 72, 'mm': 25.4 / 72, 'in': 1 / 72, '': 1.0}[unit]
+    body = []
+    for i in range(paths):
+        x, y = (i % cols) * 120 + 10, (i // cols) * 160 + 10
+        d = _svg_piece(x, y, rng.uniform(60, 100), rng.uniform(80, 130), rng)
+        body.append(f'<path fill="#000000" d="{d}"/>')
+    svg = ('<?xml version="1.0" encoding="utf-8"?>\n'
+           '<!-- Generator: synthetic benchmark corpus -->\n'
+           '<svg version="1.1" xmlns="http://www.w3.org/2000/svg" x="0px" y="0px" '
+           f'width="{view_w * factor:.3f}{unit}" height="{view_h * factor:.3f}{unit}" '
+           f'viewBox="0 0 {view_w:.3f} {view_h:.3f}" xml:space="preserve">\n'
+           '<g id="Layer_1">\n' + '\n'.join(body) + '\n</g>\n</svg>\n')
+    Path(path).write_text(svg)
+    return Path(path)
+
+
+def build_corpus(out_dir, scale='small', seed=0):
+    """Write every generator's output for the *scale* preset into *out_dir*.
+    Returns {name: path}."""
+    p = SCALES[scale]
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    return {
+        'gerber.dxf': gerber_dxf(out / 'gerber.dxf', p['pieces'], p['points'],
+                                 p['layers'], seed),
+        'blocks.dxf': block_dxf(out / 'blocks.dxf', p['blocks'], p['inserts'],
+                                p['nesting'], p['points'], seed),
+        'curves.dxf': curves_dxf(out / 'curves.dxf', p['curves'], p['layers'], seed),
+        'illustrator_pt.svg': illustrator_svg(out / 'illustrator_pt.svg',
+                                              p['svg_paths'], 'pt', seed),
+        'illustrator_mm.svg': illustrator_svg(out / 'illustrator_mm.svg',
+                                              p['svg_paths'], 'mm', seed),
+    }
@@ -0,0 +1,247 @@
+"""bench/run.py – time the conversion pipeline on a synthetic corpus.
+
+    python -m bench --scale small --repeat 5 --out bench.json
+    python -m bench compare old.json new.json
+
+Each result records the best, median and mean wall time of *repeat* runs, so
+two JSON files from different revisions can be compared entry by entry.
+"""
+import argparse
+import io
+import json
+import logging
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import ezdxf
+import numpy as np
+import shapely
+
+import dxf2txt
+from bench.corpus import SCALES, build_corpus
+
+logger = logging.getLogger(__name__)
+
+GAUGES = [(28.0, 40.0), (5.0, 7.0)]
+WRITER_MODES = {
+    'plain': {},
+    'garter': {'garter_mode': True},
+    'garter_transfers': {'garter_mode': True, 'add_transfers': True},
+    'full_cardigan': {'full_cardigan': True},
+    'half_cardigan': {'half_cardigan': True},
+}
+
+
+def timed(fn, repeat=3):
+    """Run *fn* *repeat* times; returns ({min_s, median_s, mean_s, runs}, last result)."""
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return {'min_s': min(times), 'median_s': statistics.median(times),
+            'mean_s': statistics.fmean(times), 'runs': repeat}, result
+
+
+def _record(results, name, stats, **params):
+    results.append({'name': name, 'params': params, **stats})
+    logger.info("%-28s %-40s %9.4fs", name,
+                ' '.join(f"{k}={v}" for k, v in params.items()), stats['min_s'])
+
+
+def bench_parsing(corpus, repeat, results):
+    """readfile, collect_polygons, streamed read_polygons and list_shapes per
+    corpus file."""
+    for name, path in corpus.items():
+        if path.suffix == '.dxf':
+            stats, doc = timed(lambda: ezdxf.readfile(path), repeat)
+            _record(results, 'ezdxf.readfile', stats, file=name)
+            stats, polys = timed(lambda: dxf2txt.collect_polygons(doc), repeat)
+            _record(results, 'collect_polygons', stats, file=name, outlines=len(polys))
+            stats, _ = timed(lambda: dxf2txt.read_polygons(str(path), stream=True), repeat)
+            _record(results, 'read_polygons', stats, file=name, stream=True)
+        stats, shapes = timed(lambda: dxf2txt.list_shapes(str(path)), repeat)
+        _record(results, 'list_shapes', stats, file=name, shapes=len(shapes))
+        for sts10, rows10 in GAUGES:
+            fidelity = dxf2txt.gauge_fidelity(sts10, rows10)
+            stats, _ = timed(lambda: dxf2txt.list_shapes(str(path), fidelity=fidelity), repeat)
+            _record(results, 'list_shapes', stats, file=name, sts10=sts10, rows10=rows10)
+
+
+def _largest_shape(corpus):
+    shapes = [s for p in corpus.values() if p.suffix == '.dxf'
+              for s in dxf2txt.list_shapes(str(p))]
+    return max(shapes, key=lambda s: s[1].area)
+
+
+def _geometry_mirror_grid(poly, sts10, rows10, heal):
+    """The geometric mirror that mirrored_grid replaces: union with the
+    reflected outline, close the seam, then rasterize."""
+    from shapely.affinity import scale
+    minx, miny, maxx, maxy = poly.bounds
+    mirrored = scale(poly, xfact=-1, yfact=1, origin=(minx, (miny + maxy) / 2))
+    joined = shapely.union_all([poly, mirrored]).buffer(heal).buffer(-heal)
+    return dxf2txt.scanline_grid(joined, sts10, rows10)
+
+
+def bench_raster(corpus, repeat, results):
+    """Reference row_stitch_counts against scanline_stitch_counts, with a
+    parity flag, and the geometric mirror against mirrored_grid, on the
+    largest shape at each gauge."""
+    name, poly = _largest_shape(corpus)
+    for sts10, rows10 in GAUGES:
+        stats, ref = timed(lambda: list(dxf2txt.row_stitch_counts(poly, sts10, rows10)), repeat)
+        _record(results, 'row_stitch_counts', stats, shape=name, sts10=sts10, rows10=rows10)
+        stats, fast = timed(lambda: dxf2txt.scanline_stitch_counts(poly, sts10, rows10), repeat)
+        _record(results, 'scanline_stitch_counts', stats, shape=name, sts10=sts10,
+                rows10=rows10, rows=len(fast), matches_reference=fast == ref)
+        heal = dxf2txt.gauge_fidelity(sts10, rows10).heal
+        stats, geom = timed(lambda: _geometry_mirror_grid(poly, sts10, rows10, heal), repeat)
+        _record(results, 'mirror_geometry', stats, shape=name, sts10=sts10, rows10=rows10)
+        stats, grid = timed(lambda: dxf2txt.mirrored_grid(poly, sts10, rows10, 'left', heal), repeat)
+        same = sum(a == b for a, b in zip(grid.runs(), geom.runs()))
+        _record(results, 'mirrored_grid', stats, shape=name, sts10=sts10, rows10=rows10,
+                rows_matching_geometry=f"{same}/{grid.rows}")
+
+
+def bench_writer(corpus, repeat, results, out_dir):
+    """_write_shape in every stitch mode on the largest shape."""
+    name, poly = _largest_shape(corpus)
+    for sts10, rows10 in GAUGES:
+        counts = dxf2txt.scanline_stitch_counts(poly, sts10, rows10)
+        for mode, options in WRITER_MODES.items():
+            path = Path(out_dir) / f"{mode}.txt"
+            stats, _ = timed(lambda: dxf2txt._write_shape(
+                path, name, 'bench', counts, sts10, rows10, **options), repeat)
+            _record(results, '_write_shape', stats, mode=mode, sts10=sts10,
+                    rows10=rows10, bytes=path.stat().st_size)
+
+
+def bench_routes(corpus, repeat, results, upload_dir):
+    """Flask routes through the test client, with R2 uploads disabled."""
+    import app as appmod
+    appmod.app.logger.setLevel(logging.WARNING)
+    appmod.UPLOAD_FOLDER = Path(upload_dir)
+    # benchmarks measure local work only; nothing leaves the machine
+    appmod.r2_upload = lambda key, fileobj: None
+    appmod.r2_exists = lambda key: False
+    client = appmod.app.test_client()
+    gauge = {'sts10': '28', 'rows10': '40'}
+    for name, path in corpus.items():
+        data = path.read_bytes()
+
+        def upload():
+            resp = client.post('/convert', data={
+                'dxf_file': (io.BytesIO(data), name), 'units': 'mm', **gauge},
+                content_type='multipart/form-data')
+            assert resp.status_code == 200, resp.status_code
+            return re.search(rb'name="session_id" value="([0-9a-f]+)"', resp.data).group(1).decode()
+
+        stats, session_id = timed(upload, repeat)
+        _record(results, 'POST /convert', stats, file=name)
+        form = {'session_id': session_id, 'unit_scale': '1.0', **gauge}
+        if path.suffix == '.dxf':
+            query = f"session_id={session_id}&piece_index=1&rotation=90&mirror=left&unit_scale=1.0"
+            # cold render first, then conditional and cached hits
+            stats, resp = timed(lambda: client.get(f"/preview_shape?{query}"), 1)
+            _record(results, 'GET /preview_shape', stats, file=name, cache='cold')
+            etag = resp.headers.get('ETag')
+            stats, _ = timed(lambda: client.get(f"/preview_shape?{query}"), repeat)
+            _record(results, 'GET /preview_shape', stats, file=name, cache='warm')
+            stats, _ = timed(lambda: client.get(f"/preview_shape?{query}",
+                                                headers={'If-None-Match': etag}), repeat)
+            _record(results, 'GET /preview_shape', stats, file=name, cache='304')
+        stats, _ = timed(lambda: client.post('/convert_shape', data={
+            **form, 'piece_index': '1', 'garter': '1'}), repeat)
+        _record(results, 'POST /convert_shape', stats, file=name)
+        stats, _ = timed(lambda: client.post('/convert_all', data=form).get_data(), repeat)
+        _record(results, 'POST /convert_all', stats, file=name)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scale='small', repeat=3, seed=0, routes=True):
+    """Generate a corpus and time every stage; returns the JSON-able report."""
+    results = []
+    with tempfile.TemporaryDirectory(prefix='bench_') as tmp:
+        tmp = Path(tmp)
+        corpus = build_corpus(tmp / 'corpus', scale, seed)
+        bench_parsing(corpus, repeat, results)
+        bench_raster(corpus, repeat, results)
+        (tmp / 'out').mkdir()
+        bench_writer(corpus, repeat, results, tmp / 'out')
+        if routes:
+            (tmp / 'uploads').mkdir()
+            bench_routes(corpus, repeat, results, tmp / 'uploads')
+        sizes = {name: path.stat().st_size for name, path in corpus.items()}
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'revision': _git_revision(),
+            'scale': scale, 'corpus': SCALES[scale], 'seed': seed, 'repeat': repeat,
+            'file_bytes': sizes,
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'numpy': np.__version__, 'shapely': shapely.__version__,
+            'ezdxf': ezdxf.__version__,
+        },
+        'results': results,
+    }
+
+
+def _key(entry):
+    return entry['name'], json.dumps(
+        {k: v for k, v in entry['params'].items() if k in ('file', 'shape', 'mode', 'sts10', 'rows10', 'cache')},
+        sort_keys=True)
+
+
+def compare(old_path, new_path):
+    """Print new/old best-time ratios for entries present in both reports."""
+    old = {_key(e): e for e in json.loads(Path(old_path).read_text())['results']}
+    new = json.loads(Path(new_path).read_text())['results']
+    for entry in new:
+        before = old.get(_key(entry))
+        if before is None:
+            continue
+        ratio = entry['min_s'] / before['min_s'] if before['min_s'] else float('inf')
+        print(f"{entry['name']:<24} {_key(entry)[1]:<60} "
+              f"{before['min_s']:9.4f}s -> {entry['min_s']:9.4f}s  x{ratio:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bench', description=__doc__.split('\n')[0])
+    sub = parser.add_subparsers(dest='command')
+    cmp_parser = sub.add_parser('compare', help='compare two JSON reports')
+    cmp_parser.add_argument('old')
+    cmp_parser.add_argument('new')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-routes', action='store_true', help='skip the Flask routes')
+    parser.add_argument('--out', help='write the JSON report here (default: stdout)')
+    args = parser.parse_args(argv)
+    if args.command == 'compare':
+        compare(args.old, args.new)
+        return 0
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    # the pipeline's own INFO logs would drown the timings
+    for name in ('dxf2txt', 'ezdxf'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    report = run(args.scale, args.repeat, args.seed, routes=not args.no_routes)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text)
+    else:
+        sys.stdout.write(text + '\n')
+    return 0
@@ -24,4 +24,39 @@ R2_SECRET_ACCESS_KEY = os.getenv("R2_SECRET_ACCESS_KEY") or CLOUDFLARE_API_TOKEN
 # Cloudflare R2 API endpoints
 CLOUDFLARE_R2_API_BASE = f"https://api.cloudflare.com/client/v4/accounts/{CLOUDFLARE_ACCOUNT_ID}/r2/buckets/{CLOUDFLARE_BUCKET}/objects"
 # Public base URL for direct object access
-CLOUDFLARE_R2_PUBLIC_BASE = os.getenv("CLOUDFLARE_R2_PUBLIC_BASE") or f"https://{CLOUDFLARE_ACCOUNT_ID}.r2.cloudflarestorage.com/{CLOUDFLARE_BUCKET}" 
\ No newline at end of file
+CLOUDFLARE_R2_PUBLIC_BASE = os.getenv("CLOUDFLARE_R2_PUBLIC_BASE") or f"https://{CLOUDFLARE_ACCOUNT_ID}.r2.cloudflarestorage.com/{CLOUDFLARE_BUCKET}" 
+# Upload tuning: concurrent R2 uploads (also the HTTP connection pool size)
+# and the size above which objects go through S3 multipart upload
+R2_UPLOAD_WORKERS = int(os.getenv("R2_UPLOAD_WORKERS", "8"))
+R2_MULTIPART_THRESHOLD = int(os.getenv("R2_MULTIPART_THRESHOLD", str(16 * 1024 * 1024)))
+R2_MULTIPART_CHUNKSIZE = int(os.getenv("R2_MULTIPART_CHUNKSIZE", str(8 * 1024 * 1024)))
+# Multipart needs real S3 keys; the account id/API token fallbacks above are not
+R2_MULTIPART_ENABLED = bool(os.getenv("R2_ACCESS_KEY_ID") and os.getenv("R2_SECRET_ACCESS_KEY"))
+# How many keys known to be on R2 are remembered, skipping their HEAD
+R2_KNOWN_KEYS = int(os.getenv("R2_KNOWN_KEYS", "100000"))
+
+# Background job mode for /convert and /convert_shape: JOB_MODE=1 queues every
+# conversion (otherwise only requests with job=1), with bounded concurrency,
+# queue depth and a per-job time budget in seconds
+JOB_MODE = os.getenv("JOB_MODE", "").lower() in ("1", "true", "yes")
+JOB_BACKEND = os.getenv("JOB_BACKEND", "inprocess")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_DEPTH = int(os.getenv("JOB_QUEUE_DEPTH", "16"))
+JOB_TIME_BUDGET = float(os.getenv("JOB_TIME_BUDGET", "120"))
+
+# /preview_shape memo: in-memory budget in bytes (older entries spill to disk)
+# and the Cache-Control max-age sent with previews
+PREVIEW_CACHE_BYTES = int(os.getenv("PREVIEW_CACHE_BYTES", str(32 * 1024 * 1024)))
+PREVIEW_MAX_AGE = int(os.getenv("PREVIEW_MAX_AGE", "86400"))
+# Level of detail for preview SVGs: outlines are simplified to one pixel at
+# this many pixels across (0 keeps full detail)
+PREVIEW_LOD = int(os.getenv("PREVIEW_LOD", "600")) or None
+# Stage timing: Server-Timing headers on every response and Prometheus
+# histograms/counters at /metrics (off by default)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "").lower() in ("1", "true", "yes")
+# Largest accepted request body in bytes (uploads stream to disk and are
+# rejected with 413 as soon as they pass it); 0 disables the limit
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+# Streaming DXF reads: walk modelspace entity by entity (ezdxf iterdxf) with
+# bounded memory; files with INSERTs still load in full
+DXF_STREAMING = os.getenv("DXF_STREAMING", "").lower() in ("1", "true", "yes")
@@ -2,65 +2,187 @@
 Call `convert(dxf_path, out_dir, sts10, rows10, wanted_layers=None)` from your
 Flask app.  Returns list of generated .txt paths.
 
-This version heals tiny gaps, samples SPLINEs, expands INSERT blocks, merges
+This version heals tiny gaps, flattens SPLINEs, expands INSERT blocks, merges
 LINE/ARC chains (Gerber/Lectra exports), and lets you filter by layer names.
 """
 from pathlib import Path
-import math, logging
-from typing import List, Iterable
+import math, logging, hashlib, json, os, re, tempfile, threading, time
+from collections import OrderedDict, Counter
+from contextlib import contextmanager
+from typing import List, Iterable, NamedTuple
+import numpy as np
 import ezdxf                     # pip install ezdxf
+import shapely
 from shapely.geometry import Polygon, LineString, MultiLineString
 from shapely.ops import linemerge
+from shapely.strtree import STRtree
+import metrics
 
 logger = logging.getLogger(__name__)
 TOL = 0.05  # mm tolerance when welding small gaps
 
 # ---------------------------------------------------------------------------
-# entity → polygons helper ---------------------------------------------------
+# curve flattening -----------------------------------------------------------
 
-def _entity_to_polys(ent, layer: str, polys: List, wanted_layers: Iterable[str]):
+FLATTEN_TOL = 0.1   # mm, max sagitta between a curve and its polyline
+FLATTEN_MAX = 1024  # cap on chords per Bézier segment
+
+def bezier_segment_counts(ctrl: np.ndarray, tol: float = FLATTEN_TOL) -> np.ndarray:
+    """Chords needed per Bézier so no point strays more than *tol* (Wang's formula).
+
+    *ctrl* is (S, k+1, 2) control points of S degree-k segments.  Uniform
+    subdivision into n = ceil(sqrt(k(k-1)·M / 8·tol)) chords, M the largest
+    second difference of the control polygon, bounds the sagitta by *tol*;
+    straight segments get a single chord.
+    """
+    k = ctrl.shape[1] - 1
+    if k < 2:
+        return np.ones(len(ctrl), dtype=np.int64)
+    second = ctrl[:, 2:] - 2 * ctrl[:, 1:-1] + ctrl[:, :-2]
+    m = np.linalg.norm(second, axis=2).max(axis=1)
+    n = np.ceil(np.sqrt(k * (k - 1) * m / (8 * tol)))
+    return np.clip(n, 1, FLATTEN_MAX).astype(np.int64)
+
+def flatten_beziers(ctrl: np.ndarray, tol: float = FLATTEN_TOL):
+    """Flatten a batch of Béziers in one NumPy pass.
+
+    Returns (points, counts): segment i contributes counts[i] points from its
+    start up to, but excluding, its end, so consecutive segments of a chain
+    concatenate without duplicates (see `flatten_chains`).
+    """
+    ctrl = np.asarray(ctrl, dtype=float)
+    k = ctrl.shape[1] - 1
+    counts = bezier_segment_counts(ctrl, tol)
+    seg = np.repeat(np.arange(len(ctrl)), counts)
+    offsets = np.cumsum(counts) - counts
+    t = (np.arange(len(seg)) - offsets[seg]) / counts[seg]
+    # Bernstein basis, (N, k+1)
+    i = np.arange(k + 1)
+    binom = np.array([math.comb(k, j) for j in i], dtype=float)
+    basis = binom * t[:, None] ** i * (1 - t[:, None]) ** (k - i)
+    points = np.einsum('nj,njd->nd', basis, ctrl[seg])
+    return points, counts
+
+def flatten_chains(ctrl: np.ndarray, chain_lengths, tol: float = FLATTEN_TOL):
+    """Flatten consecutive runs of *chain_lengths* Béziers into polylines.
+
+    Each chain's polyline ends on its last control point, so closed chains
+    repeat their first vertex.
+    """
+    points, counts = flatten_beziers(ctrl, tol)
+    seg_ends = np.cumsum(chain_lengths)
+    pt_ends = np.concatenate(([0], np.cumsum(counts)))[seg_ends]
+    lines, start = [], 0
+    for seg_end, pt_end in zip(seg_ends, pt_ends):
+        lines.append(np.vstack((points[start:pt_end], ctrl[seg_end - 1, -1])))
+        start = pt_end
+    return lines
+
+def _svg_segment_cubics(seg, tol: float) -> list:
+    """svgpathtools segment → list of cubic control polygons (4 complex)."""
+    from svgpathtools import Arc
+    if isinstance(seg, Arc):
+        # arcs: chord count from the sagitta of the larger radius
+        r = max(abs(seg.radius.real), abs(seg.radius.imag), tol)
+        step = 2 * math.acos(max(-1.0, 1 - tol / r))
+        n = int(min(FLATTEN_MAX, max(1, math.ceil(math.radians(abs(seg.delta)) / step))))
+        pts = seg.point(np.linspace(0, 1, n + 1))
+        return [(a, a + (b - a) / 3, a + 2 * (b - a) / 3, b) for a, b in zip(pts[:-1], pts[1:])]
+    bp = seg.bpoints()
+    if len(bp) == 2:
+        a, b = bp
+        return [(a, a + (b - a) / 3, a + 2 * (b - a) / 3, b)]
+    if len(bp) == 3:
+        # exact degree elevation, quadratic → cubic
+        a, c, b = bp
+        return [(a, a + 2 * (c - a) / 3, b + 2 * (c - b) / 3, b)]
+    return [tuple(bp)]
+
+def spline_points(ent, tol: float = FLATTEN_TOL) -> np.ndarray:
+    """Flatten a DXF SPLINE to an (N, 2) polyline within *tol*.
+
+    Clamped non-rational splines are split into Bézier segments and flattened
+    in one batch; anything else uses ezdxf's own adaptive flattening.
+    """
+    bspline = ent.construction_tool()
+    try:
+        beziers = [[(v.x, v.y) for v in seg] for seg in bspline.bezier_decomposition()]
+    except TypeError:
+        beziers = None
+    if not beziers:
+        return np.array([(v.x, v.y) for v in bspline.flattening(tol)])
+    ctrl = np.asarray(beziers, dtype=float)
+    return flatten_chains(ctrl, [len(ctrl)], tol)[0]
+
+# ---------------------------------------------------------------------------
+# fidelity budget ------------------------------------------------------------
+
+FIDELITY_FRACTION = 0.05  # of the smaller stitch dimension
+
+class Fidelity(NamedTuple):
+    """Geometric tolerances for one conversion, in mm.
+
+    flatten – max sagitta when arcs, circles, ellipses and curves become
+    polylines; simplify – outline simplification before rasterizing (0 keeps
+    every vertex); heal – closing distance, e.g. at a mirrored seam; weld –
+    LINE/ARC endpoint gap welding.
+    """
+    flatten: float = FLATTEN_TOL
+    simplify: float = 0.0
+    heal: float = TOL
+    weld: float = TOL
+
+    def scaled(self, factor: float) -> 'Fidelity':
+        """The same budget in drawing units that are *factor* mm each."""
+        if factor == 1.0:
+            return self
+        return Fidelity(*(v / factor for v in self))
+
+    def key(self) -> str:
+        return '/'.join(f"{v:.6g}" for v in self)
+
+def gauge_fidelity(sts10: float, rows10: float,
+                   fraction: float = FIDELITY_FRACTION) -> Fidelity:
+    """Tolerances worth spending at a gauge: *fraction* of a stitch.
+
+    At 28 sts × 40 rows a stitch is 2.5 mm tall, giving 0.125 mm; at 5 sts a
+    20 mm stitch tolerates far coarser outlines.  Healing never drops below
+    TOL.  Welding stays at TOL whatever the gauge: digitized curves often
+    step by less than a coarse stitch, and welding them at that distance
+    would weld across the curve.
+    """
+    if not (0 < sts10 < math.inf and 0 < rows10 < math.inf):
+        raise ValueError(f"gauge must be positive stitches and rows per 10 cm, "
+                         f"got {sts10!r} x {rows10!r}")
+    tol = fraction * min(100.0 / sts10, 100.0 / rows10)
+    return Fidelity(flatten=tol, simplify=tol, heal=max(TOL, tol))
+
+# ---------------------------------------------------------------------------
+# entity → rings helper ------------------------------------------------------
+
+def _entity_to_rings(ent, layer: str, rings: List, wanted_layers: Iterable[str],
+                     fidelity: Fidelity = Fidelity()):
+    """Append (layer, ring coordinates) for each closed outline in *ent*.
+    Rings stay raw; `heal_rings` turns them into polygons in bulk."""
     if wanted_layers and layer.upper().strip() not in wanted_layers:
         return
     # HATCH boundary paths --------------------------------------------------
     if ent.dxftype() == "HATCH":
-        for path in ent.paths:
-            coords = []
-            for edge in path.edges:
-                # try polyline edge vertices first
-                pts = []
-                try:
-                    pts = [(pt.x, pt.y) for pt in edge.vertices()]
-                except Exception:
-                    try:
-                        pts = [(pt.x, pt.y) for pt in edge.flattening(TOL)]
-                    except Exception:
-                        continue
-                coords.extend(pts)
-            if coords and coords[0] != coords[-1]:
-                coords.append(coords[0])
-            poly = Polygon(coords).buffer(TOL)
-            if poly.is_valid:
-                polys.append((layer, poly))
+        # polyline and edge paths alike, bulges and OCS resolved by ezdxf
+        from ezdxf import path as ezpath
+        for path in ezpath.from_hatch(ent):
+            rings.append((layer, [(pt.x, pt.y) for pt in path.flattening(fidelity.flatten)]))
         return
     # Polyline (lightweight) --------------------------------------------------
     if ent.dxftype() == "LWPOLYLINE":
-        pts = [tuple(pt[:2]) for pt in ent.get_points()]
-        # Require at least 3 points to form a polygon
-        if len(pts) < 3:
-            return
-        # Force closure
-        if pts[0] != pts[-1]:
-            pts.append(pts[0])
-        poly = Polygon(pts).buffer(TOL)
-        if poly.is_valid:
-            polys.append((layer, poly))
+        rings.append((layer, [tuple(pt[:2]) for pt in ent.get_points()]))
         return
     # Classic POLYLINE -------------------------------------------------------
     if ent.dxftype() == "POLYLINE":
         # Flatten polyline segments (handles bulges), fallback to get_points or vertices
         coords = []
         try:
-            coords = [(pt[0], pt[1]) for pt in ent.flattening(TOL)]
+            coords = [(pt[0], pt[1]) for pt in ent.flattening(fidelity.flatten)]
         except Exception:
             try:
                 coords = [tuple(pt[:2]) for pt in ent.get_points()]
@@ -70,125 +192,315 @@ def _entity_to_polys(ent, layer: str, polys: List, wanted_layers: Iterable[str])
                 except Exception:
                     logger.error("Failed to get coordinates for POLYLINE entity on layer %s", layer)
                     return
-        # Require at least 3 points to form a polygon
-        if len(coords) < 3:
-            return
-        # Force closure
-        if coords[0] != coords[-1]:
-            coords.append(coords[0])
-        poly = Polygon(coords).buffer(TOL)
-        if poly.is_valid:
-            polys.append((layer, poly))
+        rings.append((layer, coords))
         return
     # Spline -----------------------------------------------------------------
     if ent.dxftype() == "SPLINE":
-        pts = [ent.point(t)[:2] for t in (i/100 for i in range(101))]
-        poly = Polygon(pts).buffer(TOL)
-        if poly.is_valid:
-            polys.append((layer, poly))
+        rings.append((layer, spline_points(ent, fidelity.flatten)))
+        return
+    # Circle and closed ellipse ----------------------------------------------
+    if ent.dxftype() == "CIRCLE" or (ent.dxftype() == "ELLIPSE" and _ellipse_closed(ent)):
+        rings.append((layer, [(pt.x, pt.y) for pt in ent.flattening(fidelity.flatten)]))
+        return
+    # Line/Arc/open ellipse handled in separate pass
+
+def heal_rings(rings: List, fidelity: Fidelity = Fidelity()) -> List:
+    """[(layer, ring coordinates)] → [(layer, Polygon)], vectorized.
+
+    Repeated consecutive vertices are collapsed, rings forced closed, and
+    ones with fewer than 3 distinct vertices dropped.  The rest are built, simplified and grown by TOL in single
+    shapely calls; any result that is still invalid goes through
+    `make_valid`, and empty or non-polygonal results are dropped.
+    """
+    layers, arrays = [], []
+    for layer, coords in rings:
+        pts = np.asarray(coords, dtype=float).reshape(-1, 2)
+        if len(pts) > 1:
+            pts = pts[np.concatenate(([True], (pts[1:] != pts[:-1]).any(axis=1)))]
+        # Force closure; linearrings re-adds the closing vertex
+        if len(pts) > 1 and np.array_equal(pts[0], pts[-1]):
+            pts = pts[:-1]
+        # Require at least 3 distinct points to form a polygon
+        if len(pts) < 3 or len(np.unique(pts, axis=0)) < 3:
+            continue
+        layers.append(layer)
+        arrays.append(pts)
+    if not arrays:
+        return []
+    lengths = [len(pts) for pts in arrays]
+    ring_idx = np.repeat(np.arange(len(arrays)), lengths)
+    geoms = shapely.polygons(shapely.linearrings(np.concatenate(arrays), indices=ring_idx))
+    if fidelity.simplify:
+        geoms = shapely.simplify(geoms, fidelity.simplify, preserve_topology=True)
+    # quad_segs matches Polygon.buffer's default
+    geoms = shapely.buffer(geoms, TOL, quad_segs=16)
+    invalid = ~shapely.is_valid(geoms)
+    if invalid.any():
+        logger.info("Repairing %d invalid outline(s)", int(invalid.sum()))
+        geoms[invalid] = shapely.make_valid(geoms[invalid])
+    keep = (~shapely.is_empty(geoms)
+            & np.isin(shapely.get_type_id(geoms), (3, 6)))  # (Multi)Polygon
+    return [(layers[i], geoms[i]) for i in np.flatnonzero(keep)]
+
+def _ellipse_closed(ent) -> bool:
+    sweep = (ent.dxf.end_param - ent.dxf.start_param) % math.tau
+    return math.isclose(sweep, 0.0, abs_tol=1e-9) or math.isclose(sweep, math.tau)
+
+def _chain_segment(ent, tol: float):
+    """LINE, ARC or open ELLIPSE → LineString for chain merging, else None."""
+    kind = ent.dxftype()
+    if kind == "LINE":
+        start, end = ent.dxf.start, ent.dxf.end
+        return LineString([(start.x, start.y), (end.x, end.y)])
+    if kind == "ARC" or (kind == "ELLIPSE" and not _ellipse_closed(ent)):
+        # Flatten arc into line segments
+        return LineString([(pt.x, pt.y) for pt in ent.flattening(tol)])
+    return None
+
+# ---------------------------------------------------------------------------
+# LINE/ARC chain welding -----------------------------------------------------
+
+def _weld_segments(segs, tol: float = TOL):
+    """Close gaps of up to *tol* between free segment endpoints.
+
+    Only free endpoints (positions no other endpoint shares) are welded, and
+    each joins at most one partner from another segment: candidate pairs
+    come from an STRtree and are matched closest first.  Joined chains never
+    move and no segment is merged onto its own other end, so a curve
+    digitized in steps shorter than *tol* keeps its shape.  The pair snaps
+    onto the lower-indexed point.  Returns (segments, gaps_closed).
+    """
+    segs = np.asarray(segs, dtype=object)
+    coords, seg_idx = shapely.get_coordinates(segs, return_index=True)
+    last = np.flatnonzero(np.diff(seg_idx, append=len(segs)))  # last vertex of each segment
+    first = np.concatenate(([0], last[:-1] + 1))
+    ends = np.concatenate((first, last))
+    pts = coords[ends]
+    owner = np.tile(np.arange(len(segs)), 2)
+    _, position, shared = np.unique(pts, axis=0, return_inverse=True, return_counts=True)
+    free = np.flatnonzero(shared[position.ravel()] == 1)
+    points = shapely.points(pts[free])
+    left, right = STRtree(points).query(points, predicate='dwithin', distance=tol)
+    pair = (left < right) & (owner[free[left]] != owner[free[right]])
+    left, right = free[left[pair]], free[right[pair]]
+    if not len(left):
+        return list(segs), 0
+    gap = np.hypot(*(pts[left] - pts[right]).T)
+    used = np.zeros(len(pts), dtype=bool)
+    gaps = 0
+    for k in np.argsort(gap, kind='stable'):
+        a, b = left[k], right[k]
+        if used[a] or used[b]:
+            continue
+        used[a] = used[b] = True
+        pts[b] = pts[a]
+        gaps += 1
+    coords[ends] = pts
+    welded = shapely.linestrings(coords, indices=seg_idx)
+    # drop segments that were already degenerate
+    welded = welded[shapely.length(welded) > 0]
+    return list(welded), gaps
+
+def _merge_chains(layer: str, segs: List, rings: List,
+                  fidelity: Fidelity = Fidelity()):
+    """Weld, linemerge and append the closed rings among *segs* to *rings*."""
+    segs, gaps = _weld_segments(segs, fidelity.weld)
+    if gaps:
+        logger.info("Welded %d gap(s) below %s on %s", gaps, fidelity.weld, layer)
+    if not segs:
         return
-    # Line/Arc handled in separate pass
+    merged = linemerge(MultiLineString(segs))
+    geoms = merged.geoms if hasattr(merged, 'geoms') else [merged]
+    for ls in geoms:
+        if ls.is_ring:
+            rings.append((layer, shapely.get_coordinates(ls)))
+
+# ---------------------------------------------------------------------------
+# block geometry cache -------------------------------------------------------
+
+def _block_geometry(doc, name: str, cache: dict, fidelity: Fidelity = Fidelity()):
+    """Return (piece_name, rings, segments) for block *name*, in block
+    coordinates.  Computed once per block definition and kept in *cache*, so
+    every INSERT of the same block only pays for a matrix transform.  Rings
+    are raw ring coordinates, healed after placement so TOL is applied in
+    drawing units even under scaled inserts.
+    """
+    hit = cache.get(name)
+    if hit is not None:
+        return hit
+    block = doc.blocks.get(name)
+    piece_name = name
+    rings, segs = [], []
+    if block is not None:
+        # Determine piece name from TEXT entities in this block
+        for ent in block:
+            if ent.dxftype() == "TEXT":
+                txt = getattr(ent.dxf, 'text', None)
+                if txt and 'Piece Name:' in txt:
+                    piece_name = txt.split(':', 1)[1].strip()
+                    break
+        for ent in block:
+            _entity_to_rings(ent, piece_name, rings, None, fidelity)
+            seg = _chain_segment(ent, fidelity.flatten)
+            if seg is not None:
+                segs.append(seg)
+    hit = cache[name] = (piece_name,
+                         [np.asarray(coords, dtype=float).reshape(-1, 2)
+                          for _, coords in rings],
+                         np.array(segs, dtype=object))
+    return hit
+
+def _insert_transform(insert):
+    """(linear, offset) of the INSERT's matrix for (N, 2) coordinates."""
+    m = np.array(list(insert.matrix44().rows()))
+    # ezdxf matrices act on row vectors: [x y 0 1] @ m
+    return m[:2, :2], m[3, :2]
+
+def _place(geoms, insert):
+    """Apply the INSERT's transformation matrix to cached block geometry."""
+    if not len(geoms):
+        return []
+    linear, offset = _insert_transform(insert)
+    return list(shapely.transform(geoms, lambda pts: pts @ linear + offset))
+
+def _place_rings(rings, insert):
+    """Apply the INSERT's transformation matrix to cached ring coordinates."""
+    if not rings:
+        return []
+    linear, offset = _insert_transform(insert)
+    lengths = np.cumsum([len(pts) for pts in rings])[:-1]
+    return np.split(np.concatenate(rings) @ linear + offset, lengths)
 
 # ---------------------------------------------------------------------------
 # main collector -------------------------------------------------------------
 
-def collect_polygons(doc, wanted_layers=None):
+class _NeedsDocument(Exception):
+    """Raised while streaming when block definitions must be resolved."""
+
+def collect_polygons(doc, wanted_layers=None, fidelity: Fidelity = Fidelity()):
     """Return list[(layer, Polygon)] of closed outlines in *doc* modelspace.
-    Handles POLYLINE/LWPOLYLINE, SPLINE, INSERT-contained entities, and
-    LINE/ARC chains (merged).
+    Handles POLYLINE/LWPOLYLINE, SPLINE, CIRCLE/ELLIPSE, INSERT-contained
+    entities, and LINE/ARC chains (merged).  *fidelity* is in drawing units.
     """
-    msp = doc.modelspace()
-    polys: List = []
+    return _collect(doc.modelspace(), doc, wanted_layers, fidelity)
+
+def _collect(msp, doc, wanted_layers, fidelity):
+    """collect_polygons over the entity iterable *msp*.  Without a *doc*
+    (streamed entities) an INSERT or the block-definition fallback raises
+    _NeedsDocument instead."""
+    # raw (layer, ring coordinates), healed in bulk by heal_rings
+    rings: List = []
     # segments for line/arc merging
     segs_by_layer = {}
+    # modelspace LINE/ARC segments, bucketed by layer during the single pass
+    msp_segs = {}
+    # block name -> (piece_name, rings, segments) in block coordinates
+    blocks = {}
+    counts = Counter()
+    t0 = time.perf_counter()
 
-    # Pass 1 – explicit entities + expanded INSERTs
+    # Pass 1 – one streaming pass: explicit entities, placed INSERTs and
+    # LINE/ARC segments dispatched by type and layer
     for e in msp:
-        if e.dxftype() == "INSERT":
-            # Determine piece name from TEXT entities in this block reference
-            ves = list(e.virtual_entities())
-            piece_name = e.dxf.name
-            for ent2 in ves:
-                if ent2.dxftype() == "TEXT":
-                    txt = getattr(ent2.dxf, 'text', None)
-                    if txt and 'Piece Name:' in txt:
-                        piece_name = txt.split(':', 1)[1].strip()
-                        break
-            # flatten block reference into primitives under piece_name
-            for ent in ves:
-                _entity_to_polys(ent, piece_name, polys, wanted_layers)
-                # record line/arc segments for merging by piece_name
-                if ent.dxftype() == 'LINE':
-                    start, end = ent.dxf.start, ent.dxf.end
-                    segs_by_layer.setdefault(piece_name, []).append(
-                        LineString([(start.x, start.y), (end.x, end.y)])
-                    )
-                elif ent.dxftype() == 'ARC':
-                    pts = [(pt.x, pt.y) for pt in ent.flattening(0.5)]
-                    segs_by_layer.setdefault(piece_name, []).append(
-                        LineString(pts)
-                    )
+        kind = e.dxftype()
+        counts[kind] += 1
+        if kind == "INSERT":
+            if doc is None:
+                raise _NeedsDocument(e.dxf.name)
+            # place the cached block geometry under its piece name
+            piece_name, block_rings, block_segs = _block_geometry(
+                doc, e.dxf.name, blocks, fidelity)
+            if not wanted_layers or piece_name.upper().strip() in wanted_layers:
+                rings.extend((piece_name, pts) for pts in _place_rings(block_rings, e))
+            # record line/arc segments for merging by piece_name
+            if len(block_segs):
+                segs_by_layer.setdefault(piece_name, []).extend(_place(block_segs, e))
             continue
-        _entity_to_polys(e, e.dxf.layer, polys, wanted_layers)
+        if kind in ("LINE", "ARC", "ELLIPSE"):
+            seg = _chain_segment(e, fidelity.flatten)
+            if seg is not None:
+                layer = e.dxf.layer
+                if not wanted_layers or layer.upper().strip() in wanted_layers:
+                    msp_segs.setdefault(layer, []).append(seg)
+                continue
+        _entity_to_rings(e, e.dxf.layer, rings, wanted_layers, fidelity)
+    t1 = time.perf_counter()
 
-    # Pass 2 – merge LINE/ARC chains by layer
-    for layer in {e.dxf.layer for e in msp if e.dxftype() in ("LINE", "ARC")}:
-        if wanted_layers and layer.upper().strip() not in wanted_layers:
-            continue
-        segs = []
-        for e in msp.query(f'LINE ARC[layer=="{layer}"]'):
-            if e.dxftype() == 'LINE':
-                start = e.dxf.start
-                end = e.dxf.end
-                segs.append(LineString([(start.x, start.y), (end.x, end.y)]))
-            else:  # ARC
-                # Flatten arc into line segments
-                pts = [(pt.x, pt.y) for pt in e.flattening(0.5)]
-                segs.append(LineString(pts))
-        if not segs:
-            continue
-        merged = linemerge(MultiLineString(segs))
-        ls_geoms = merged.geoms if hasattr(merged, 'geoms') else [merged]
-        for ls in ls_geoms:
-            if ls.is_ring:
-                poly = Polygon(ls.coords).buffer(TOL)
-                if poly.is_valid:
-                    polys.append((layer, poly))
+    # Pass 2 – weld and merge the bucketed LINE/ARC chains by layer, then
+    # heal every ring in one vectorized batch
+    for layer, segs in msp_segs.items():
+        _merge_chains(layer, segs, rings, fidelity)
+    polys = heal_rings(rings, fidelity)
+    t2 = time.perf_counter()
 
     if not polys:
+        if doc is None:
+            raise _NeedsDocument("no modelspace outlines")
+        rings = []
         # Fallback: scan block definitions for closed polylines, hatches, splines
         for block_layout in doc.blocks:
             for ent in block_layout:
-                _entity_to_polys(ent, ent.dxf.layer, polys, wanted_layers)
+                _entity_to_rings(ent, ent.dxf.layer, rings, wanted_layers, fidelity)
         # Fallback: merge line/arc loops found in block definitions
         for block_layout in doc.blocks:
             for e in block_layout:
-                if e.dxftype() == "LINE":
-                    start, end = e.dxf.start, e.dxf.end
-                    segs_by_layer.setdefault(e.dxf.layer, []).append(
-                        LineString([(start.x, start.y), (end.x, end.y)])
-                    )
-                elif e.dxftype() == "ARC":
-                    pts = [(pt.x, pt.y) for pt in e.flattening(0.5)]
-                    segs_by_layer.setdefault(e.dxf.layer, []).append(
-                        LineString(pts)
-                    )
+                seg = _chain_segment(e, fidelity.flatten)
+                if seg is not None:
+                    segs_by_layer.setdefault(e.dxf.layer, []).append(seg)
         for layer, segs in segs_by_layer.items():
-            merged = linemerge(MultiLineString(segs))
-            geoms = merged.geoms if hasattr(merged, 'geoms') else [merged]
-            for ls in geoms:
-                if ls.is_ring:
-                    poly = Polygon(ls.coords).buffer(TOL)
-                    if poly.is_valid:
-                        polys.append((layer, poly))
+            _merge_chains(layer, segs, rings, fidelity)
+        polys = heal_rings(rings, fidelity)
         logger.info("Fallback detected %d shape(s) in block definitions", len(polys))
+    metrics.record('collect_scan', t1 - t0)
+    metrics.record('collect_merge_heal', t2 - t1)
+    if metrics.enabled:
+        for kind, n in counts.items():
+            metrics.count('entities_total', n, type=kind)
+    logger.info("collect_polygons: %d entities (%s); scan %.3fs, merge+heal %.3fs, "
+                "fallback %.3fs; %d outline(s)", sum(counts.values()),
+                ", ".join(f"{k}={n}" for k, n in counts.most_common()),
+                t1 - t0, t2 - t1, time.perf_counter() - t2, len(polys))
     return polys
 
+# Opt-in streaming read: walk modelspace with ezdxf's iterdxf instead of
+# loading the whole document, for marker files too large to hold in memory
+STREAM_DXF = False
+STREAM_TYPES = ("LWPOLYLINE", "POLYLINE", "SPLINE", "HATCH", "CIRCLE", "ELLIPSE",
+                "LINE", "ARC", "INSERT")
+
+def read_polygons(dxf_path: str, wanted_layers=None, fidelity: Fidelity = Fidelity(),
+                  stream: bool = None):
+    """collect_polygons for the DXF file at *dxf_path*.
+
+    With *stream* (default STREAM_DXF) modelspace entities are parsed one at
+    a time, so memory is bounded by the outlines kept rather than by the
+    document.  Files that need block resolution (an INSERT, or no modelspace
+    outlines so block definitions must be scanned) are read again in full.
+    """
+    if STREAM_DXF if stream is None else stream:
+        from ezdxf.addons import iterdxf
+        try:
+            with metrics.span('stream_collect'):
+                return _collect(iterdxf.modelspace(dxf_path, types=STREAM_TYPES),
+                                None, wanted_layers, fidelity)
+        except _NeedsDocument as exc:
+            logger.info("Streaming %s needs blocks (%s); loading it in full", dxf_path, exc)
+        except ezdxf.DXFStructureError as exc:
+            # e.g. binary DXF, which iterdxf cannot index
+            logger.info("Cannot stream %s (%s); loading it in full", dxf_path, exc)
+    with metrics.span('readfile'):
+        doc = ezdxf.readfile(dxf_path)
+    return collect_polygons(doc, wanted_layers, fidelity)
+
 # ---------------------------------------------------------------------------
 # raster + writer ------------------------------------------------------------
 
 def row_stitch_counts(poly: Polygon, sts10: float, rows10: float):
-    """Yield, for each row, a list of (indent_stitches, stitch_count) tuples."""
+    """Yield, for each row, a list of (indent_stitches, stitch_count) tuples.
+
+    Reference implementation (one shapely intersection per row); the
+    converters use the equivalent `scanline_stitch_counts` below.
+    """
     mm_row = 100 / rows10
     mm_st = 100 / sts10
     minx, miny, maxx, maxy = poly.bounds
@@ -214,43 +526,313 @@ def row_stitch_counts(poly: Polygon, sts10: float, rows10: float):
                     runs.append((indent, count))
         yield runs
 
+def _ring_edges(poly):
+    """Return (x0, y0, x1, y1) arrays for every edge of every ring in *poly*."""
+    rings = shapely.get_rings(shapely.get_parts(poly))
+    coords, ring_idx = shapely.get_coordinates(rings, return_index=True)
+    # consecutive vertices belonging to the same ring form an edge
+    same = ring_idx[:-1] == ring_idx[1:]
+    start = coords[:-1][same]
+    end = coords[1:][same]
+    return start[:, 0], start[:, 1], end[:, 0], end[:, 1]
+
+def _scan_spans(poly, ys):
+    """Even-odd spans of *poly* on the scan lines *ys*: (row, start, end)
+    arrays ordered by row, then left to right.
+
+    All ring edges are pulled into NumPy arrays, each edge is expanded to the
+    rows whose scan y it spans (half-open, so shared vertices count once) and
+    the crossings are paired per row.
+    """
+    x0, y0, x1, y1 = _ring_edges(poly)
+    lo = np.minimum(y0, y1)
+    hi = np.maximum(y0, y1)
+    # rows r with lo <= ys[r] < hi; horizontal edges span no rows
+    r_start = np.searchsorted(ys, lo, side='left')
+    r_end = np.searchsorted(ys, hi, side='left')
+    spans = r_end - r_start
+    active = spans > 0
+    if not active.any():
+        empty = np.empty(0)
+        return empty.astype(int), empty, empty
+    x0, y0, x1, y1 = x0[active], y0[active], x1[active], y1[active]
+    r_start, spans = r_start[active], spans[active]
+    # expand each edge into one entry per crossed row
+    edge = np.repeat(np.arange(len(spans)), spans)
+    offsets = np.arange(len(edge)) - np.repeat(np.cumsum(spans) - spans, spans)
+    row = r_start[edge] + offsets
+    ex0, ey0, ex1, ey1 = x0[edge], y0[edge], x1[edge], y1[edge]
+    xs = ex0 + (ys[row] - ey0) * (ex1 - ex0) / (ey1 - ey0)
+    order = np.lexsort((xs, row))
+    row, xs = row[order], xs[order]
+    # every row holds an even number of crossings: pair them left to right
+    return row[0::2], xs[0::2], xs[1::2]
+
+def _spans_grid(rows: int, run_rows, starts, ends, minx: float, mm_st: float):
+    """Quantize ordered (row, start, end) spans in mm to a StitchGrid."""
+    indents = np.rint((starts - minx) / mm_st).astype(int)
+    counts = np.rint((ends - starts) / mm_st).astype(int)
+    keep = counts > 0
+    return StitchGrid(np.searchsorted(run_rows[keep], np.arange(rows + 1)),
+                      indents[keep], counts[keep])
+
+def _scan_rows(poly, rows10: float):
+    """(rows, ys): row count and scan-line y for each row of *poly*."""
+    mm_row = 100 / rows10
+    minx, miny, maxx, maxy = poly.bounds
+    rows = max(int(math.ceil((maxy - miny) / mm_row)), 0)
+    return rows, miny + np.arange(rows) * mm_row + 1e-6
+
+def scanline_grid(poly, sts10: float, rows10: float):
+    """Edge-table version of `row_stitch_counts` computing every row at once
+    (see `_scan_spans`).  Returns the same runs as the shapely reference
+    above, as a `StitchGrid`."""
+    rows, ys = _scan_rows(poly, rows10)
+    run_rows, starts, ends = _scan_spans(poly, ys)
+    return _spans_grid(rows, run_rows, starts, ends, poly.bounds[0], 100 / sts10)
+
+def mirrored_grid(poly, sts10: float, rows10: float, mirror: str, heal: float = TOL):
+    """Rasterize *poly* joined with its mirror image about the left or right
+    edge of its bounding box, without building the mirrored geometry.
+
+    The half is scanned once; its spans are reflected about the axis and
+    merged in with the originals per row.  Spans less than 2 * *heal* apart,
+    such as the two halves meeting at the seam, are joined.  This matches the
+    union plus buffer(heal).buffer(-heal) closing on the geometry.
+    """
+    minx, miny, maxx, maxy = poly.bounds
+    axis = minx if mirror == 'left' else maxx
+    rows, ys = _scan_rows(poly, rows10)
+    run_rows, starts, ends = _scan_spans(poly, ys)
+    run_rows = np.concatenate((run_rows, run_rows))
+    starts, ends = (np.concatenate((starts, 2 * axis - ends)),
+                    np.concatenate((ends, 2 * axis - starts)))
+    order = np.lexsort((starts, run_rows))
+    run_rows, starts, ends = run_rows[order], starts[order], ends[order]
+    if len(starts):
+        # both halves' spans are disjoint and ordered within a row, so a span
+        # joins the previous one when it starts within the healing gap
+        first = np.ones(len(starts), dtype=bool)
+        first[1:] = (run_rows[1:] != run_rows[:-1]) | (starts[1:] - ends[:-1] > 2 * heal)
+        last = np.append(first[1:], True)
+        run_rows, starts, ends = run_rows[first], starts[first], ends[last]
+    return _spans_grid(rows, run_rows, starts, ends, min(minx, 2 * axis - maxx),
+                       100 / sts10)
+
+def scanline_stitch_counts(poly, sts10: float, rows10: float):
+    """`scanline_grid` as per-row lists of (indent, count) runs, the same
+    shape `row_stitch_counts` yields."""
+    return scanline_grid(poly, sts10, rows10).runs()
+
+# ---------------------------------------------------------------------------
+# stitch grid ----------------------------------------------------------------
+
+@contextmanager
+def _replace_atomically(path, mode='wb', **kwargs):
+    """Open a private temp file next to *path*, and rename it over *path*
+    once the block completes, so readers never see a partial file and
+    concurrent writers of the same path never share a temp file."""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with open(fd, mode, **kwargs) as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+class StitchGrid:
+    """A rasterized piece as run-length arrays.
+
+    Row *r* holds the runs ``indent[indptr[r]:indptr[r + 1]]`` and
+    ``count[...]`` (in stitches, left to right).  A grid depends only on the
+    outline, its transform and the gauge, so it is kept per (piece,
+    transform, gauge) and re-rendered in any stitch mode or yarn without
+    touching the geometry again.
+    """
+    __slots__ = ('indptr', 'indent', 'count')
+
+    def __init__(self, indptr, indent, count):
+        self.indptr = np.asarray(indptr, dtype=np.int32)
+        self.indent = np.asarray(indent, dtype=np.int32)
+        self.count = np.asarray(count, dtype=np.int32)
+
+    @classmethod
+    def from_runs(cls, rows):
+        """Build from per-row lists of (indent, count) runs."""
+        runs = [run for row in rows for run in row]
+        indptr = np.cumsum([0] + [len(row) for row in rows])
+        indent, count = zip(*runs) if runs else ((), ())
+        return cls(indptr, indent, count)
+
+    @property
+    def rows(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def width(self) -> int:
+        """Stitches spanned by the widest row (0 for an empty grid)."""
+        return int((self.indent + self.count).max(initial=0))
+
+    def runs(self):
+        """Per-row lists of (indent, count) tuples."""
+        indent, count = self.indent.tolist(), self.count.tolist()
+        bounds = self.indptr.tolist()
+        return [list(zip(indent[a:b], count[a:b]))
+                for a, b in zip(bounds[:-1], bounds[1:])]
+
+    def save(self, path):
+        with _replace_atomically(path) as f:
+            np.savez(f, indptr=self.indptr, indent=self.indent, count=self.count)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['indptr'], data['indent'], data['count'])
+
+# ---------------------------------------------------------------------------
+# DAK row strategies ---------------------------------------------------------
+
+def _row_spans(runs, width: int):
+    """Clip (indent, count) runs to [0, width) and merge them into sorted,
+    disjoint (start, end) column spans."""
+    spans = []
+    for indent, count in sorted(runs):
+        a, b = max(indent, 0), min(indent + count, width)
+        if a >= b:
+            continue
+        if spans and a <= spans[-1][1]:
+            if b > spans[-1][1]:
+                spans[-1] = (spans[-1][0], b)
+        else:
+            spans.append((a, b))
+    return spans
+
+class PlainRows:
+    """Row strategy for plain stockinette: yarn digit / '-' on every stitch.
+
+    A strategy turns the merged column spans of one design row into its
+    YARNS and STITCH SYMBOLS lines.  Lines are assembled from whole slices
+    of per-row templates, so the cost is per run rather than per needle.
+    """
+    rows_per_design_row = 1
+
+    def __init__(self, width: int, yarn):
+        self.width = width
+        self.yarn = str(yarn)
+
+    def paint(self, spans, template: str) -> str:
+        """Copy *template* columns inside *spans*, spaces elsewhere."""
+        parts, pos = [], 0
+        for a, b in spans:
+            if a > pos:
+                parts.append(' ' * (a - pos))
+            parts.append(template[a:b])
+            pos = b
+        if pos < self.width:
+            parts.append(' ' * (self.width - pos))
+        return ''.join(parts)
+
+    def fill(self, spans, token: str) -> str:
+        """Repeat *token* once per stitch inside *spans*, spaces elsewhere."""
+        parts, pos = [], 0
+        for a, b in spans:
+            if a > pos:
+                parts.append(' ' * (a - pos))
+            parts.append(token * (b - a))
+            pos = b
+        if pos < self.width:
+            parts.append(' ' * (self.width - pos))
+        return ''.join(parts)
+
+    def yarn_lines(self, row_idx: int, spans):
+        return [self.fill(spans, self.yarn)]
+
+    def symbol_lines(self, row_idx: int, spans):
+        return [self.fill(spans, '-')]
+
+class GarterRows(PlainRows):
+    """Garter: knit alternately on front ('-') and rear ('.') beds, optionally
+    followed by two transfer passes (even then odd needles)."""
+    ARROW_UP = '↑'
+    ARROW_DOWN = '↓'
+
+    def __init__(self, width: int, yarn, add_transfers: bool = False):
+        super().__init__(width, yarn)
+        self.add_transfers = add_transfers
+        self.rows_per_design_row = 3 if add_transfers else 1
+        # transfer-pass templates: arrow on even (A) or odd (B) needles
+        self.transfers = {}
+        for arrow in (self.ARROW_UP, self.ARROW_DOWN):
+            pair = arrow + ' '
+            self.transfers[arrow] = ((pair * (width // 2 + 1))[:width],
+                                     ((' ' + arrow) * (width // 2 + 1))[:width])
+        self.blank = '0' * width  # DAK expects a carrier-less transfer row
+
+    def yarn_lines(self, row_idx: int, spans):
+        lines = [self.fill(spans, self.yarn)]
+        if self.add_transfers:
+            lines += [self.blank, self.blank]
+        return lines
+
+    def symbol_lines(self, row_idx: int, spans):
+        even = row_idx % 2 == 0
+        lines = [self.fill(spans, '-' if even else '.')]
+        if self.add_transfers:
+            pass_a, pass_b = self.transfers[self.ARROW_UP if even else self.ARROW_DOWN]
+            lines += [self.paint(spans, pass_a), self.paint(spans, pass_b)]
+        return lines
+
+class CardiganRows(PlainRows):
+    """Full cardigan (- ^ / V .) or half cardigan (- ^ / X) on alternate rows."""
+
+    def __init__(self, width: int, yarn, half: bool = False):
+        super().__init__(width, yarn)
+        tuck = ('-^' * (width // 2 + 1))[:width]
+        other = 'X' * width if half else ('V.' * (width // 2 + 1))[:width]
+        self.templates = (tuck, other)
+
+    def symbol_lines(self, row_idx: int, spans):
+        return [self.paint(spans, self.templates[row_idx % 2])]
+
+def _row_strategy(width: int, yarn, garter_mode=False, add_transfers=False,
+                  full_cardigan=False, half_cardigan=False):
+    """Pick the row strategy for the requested stitch mode."""
+    if garter_mode:
+        return GarterRows(width, yarn, add_transfers)
+    if full_cardigan or half_cardigan:
+        return CardiganRows(width, yarn, half=not full_cardigan)
+    return PlainRows(width, yarn)
+
 # Added garter_mode parameter to support alternate stitch symbols every other row
 def _write_shape(path: Path, piece_name: str, filename_root: str,
                  sts_row: List[int], sts10: float, rows10: float,
                  garter_mode: bool = False, add_transfers: bool = False,
                  full_cardigan: bool = False, half_cardigan: bool = False,
-                 yarn: int = 4):
-    rows_orig = len(sts_row)
-    # sts_row now contains per-row runs of (indent,count)
-    # Determine max stitches width across all runs
-    max_sts = 0
-    for runs in sts_row:
-        for indent, count in runs:
-            max_sts = max(max_sts, indent + count)
-
-    # Update row count based on pattern requiring extra rows
-    if garter_mode and add_transfers:
-        rows_out = rows_orig * 3
-    else:
-        rows_out = rows_orig
-    # Helper to render a row of yarn runs
-    def render_row(runs):
-        line = [' '] * max_sts
-        for indent, count in runs:
-            for i in range(indent, indent + count):
-                if 0 <= i < max_sts:
-                    line[i] = str(yarn)
-        return ''.join(line)
-    # Helper to render a row of stitch symbols
-    def render_symbols(runs):
-        line = [' '] * max_sts
-        for indent, count in runs:
-            for i in range(indent, indent + count):
-                if 0 <= i < max_sts:
-                    line[i] = '-'
-        return ''.join(line)
-
-    with open(path, 'w', encoding='utf-8') as f:
+                 yarn: int = 4, strategy=None):
+    """Write a DAK shape file for a `StitchGrid` or per-row (indent, count)
+    runs.  *strategy* overrides the row strategy chosen from the mode flags.
+    """
+    if isinstance(sts_row, StitchGrid):
+        sts_row = sts_row.runs()
+    # sts_row contains per-row runs of (indent,count)
+    max_sts = max((indent + count for runs in sts_row for indent, count in runs),
+                  default=0)
+    if strategy is None:
+        strategy = _row_strategy(max_sts, yarn, garter_mode, add_transfers,
+                                 full_cardigan, half_cardigan)
+    rows_out = len(sts_row) * strategy.rows_per_design_row
+    spans = [_row_spans(runs, max_sts) for runs in sts_row]
+    yarn_lines, symbol_lines = [], []
+    for row_idx, row_spans in enumerate(spans):
+        yarn_lines += strategy.yarn_lines(row_idx, row_spans)
+        symbol_lines += strategy.symbol_lines(row_idx, row_spans)
+
+    with _replace_atomically(path, 'w', encoding='utf-8') as f:
         w = f.write
         w("FILE FORMAT : DAK\nFILE FORMAT VERSION : 0.43\nGARMENT PIECE\n")
         w(f"Shape filename : {filename_root}\nPiece : {piece_name}\n")
@@ -260,201 +842,326 @@ def _write_shape(path: Path, piece_name: str, filename_root: str,
         w("MAIN TENSIONS\n")
         w(f"Stitches per 10 cm =  {int(sts10)}\nRows per 10 cm =  {int(rows10)}\n")
         w("YARNS\n")
-        if not (garter_mode or full_cardigan or half_cardigan):
-            for runs in sts_row:
-                w(render_row(runs) + "\n")
-        elif garter_mode:
-            # Updated: YARNS lines must mirror STITCH SYMBOLS exactly.
-            # Knit pass: yarn digit where stitch exists, space elsewhere.
-            # Transfer passes: '0' in every column (DAK expects carrier-less row).
-            yarn_char = str(yarn) if isinstance(yarn, int) else yarn
-            for runs in sts_row:
-                # Build stitch presence mask for the design row
-                mask = render_symbols(runs)  # '-' where stitch, ' ' otherwise
-                knit_yarn_line = ''.join(
-                    yarn_char if ch != ' ' else ' ' for ch in mask)
-                w(knit_yarn_line + "\n")
-                if add_transfers:
-                    w('0' * max_sts + "\n")  # transfer pass A
-                    w('0' * max_sts + "\n")  # transfer pass B
-        elif full_cardigan or half_cardigan:
-            # YARNS for cardigan modes: mirror stitch presence with yarn digit.
-            yarn_char = str(yarn) if isinstance(yarn, int) else yarn
-            for runs in sts_row:
-                mask = render_symbols(runs)
-                line = ''.join(yarn_char if ch != ' ' else ' ' for ch in mask)
-                w(line + "\n")
+        for line in yarn_lines:
+            w(line + "\n")
         w("\nYARN PALETTE\nYarn L : 112,180,249 light blue\n")
         w("\nSTITCH SYMBOLS\n")
-        if not (garter_mode or full_cardigan or half_cardigan):
-            for runs in sts_row:
-                w(render_symbols(runs) + "\n")
-        elif garter_mode:
-            ARROW_UP = '↑'
-            ARROW_DOWN = '↓'
-            KNIT_F = '-'
-            KNIT_R = '.'
-            MISS = ' '
-
-            for row_idx, runs in enumerate(sts_row):
-                symbol_line_raw = render_symbols(runs)  # '-' where stitch, space elsewhere
-
-                # a) Knit row on appropriate bed
-                knit_sym = KNIT_F if row_idx % 2 == 0 else KNIT_R
-                knit_line = ''.join(
-                    knit_sym if ch != MISS else MISS for ch in symbol_line_raw)
-                w(knit_line + "\n")
-
-                if add_transfers:
-                    # Precompute arrow for this pair of transfer rows
-                    arrow_sym = ARROW_UP if row_idx % 2 == 0 else ARROW_DOWN
-                    width = len(knit_line)
-
-                    # b) Transfer pass A – even needles
-                    pass_a = ''.join(
-                        arrow_sym if (n % 2 == 0 and knit_line[n] != MISS) else MISS
-                        for n in range(width))
-                    w(pass_a + "\n")
-
-                    # c) Transfer pass B – odd needles
-                    pass_b = ''.join(
-                        arrow_sym if (n % 2 == 1 and knit_line[n] != MISS) else MISS
-                        for n in range(width))
-                    w(pass_b + "\n")
-        elif full_cardigan or half_cardigan:
-            # Symbol definitions
-            MISS = ' '
-            for row_idx, runs in enumerate(sts_row):
-                # Build presence mask first
-                present = [False] * max_sts
-                for indent, count in runs:
-                    for pos in range(indent, indent + count):
-                        if 0 <= pos < max_sts:
-                            present[pos] = True
-
-                symbols = []
-                if full_cardigan:
-                    if row_idx % 2 == 0:
-                        # Row A pattern: - ^ - ^ ...
-                        for col in range(max_sts):
-                            symbols.append('-' if col % 2 == 0 else '^')
-                    else:
-                        # Row B pattern: V . V . ...
-                        for col in range(max_sts):
-                            symbols.append('V' if col % 2 == 0 else '.')
-                else:  # half_cardigan
-                    if row_idx % 2 == 0:
-                        # tuck row: - ^ - ^ ...
-                        for col in range(max_sts):
-                            symbols.append('-' if col % 2 == 0 else '^')
-                    else:
-                        # plain knit both beds
-                        symbols = ['X'] * max_sts
-
-                # Replace symbol with space where no stitch on this row
-                symbol_line = ''.join(sym if present[i] else MISS for i, sym in enumerate(symbols))
-                w(symbol_line + "\n")
+        for line in symbol_lines:
+            w(line + "\n")
         w("\nSTITCH PATTERN NOTES\nSHAPE FILE NOTES\nEND\n")
 
 # ---------------------------------------------------------------------------
 # SVG preview and single-shape conversion helpers
 
-def list_shapes(dxf_path: str, wanted_layers=None, unit_scale: float = 1.0):
-    """List named shape polygons from a DXF or SVG file."""
-    ext = Path(dxf_path).suffix.lower()
-    if ext == '.svg':
-        import xml.etree.ElementTree as ET
-        from shapely.geometry import Polygon, MultiPolygon
-        from svgpathtools import parse_path, Path as SVGPath
-        tree = ET.parse(dxf_path)
-        root = tree.getroot()
-        shapes = []
-        # --- Parse artboard units and compute scale to mm ---
-        width_attr = root.get('width')
-        height_attr = root.get('height')
-        viewBox = root.get('viewBox')
-        import re
-        def parse_length(s):
-            m = re.match(r'([0-9.]+)([a-zA-Z%]*)', s)
-            if not m: return None, None
-            return float(m.group(1)), m.group(2)
-        def to_mm(val, unit):
-            u = unit.lower()
-            if u == '': return val * 25.4 / 72  # Illustrator default: points
-            if u == 'pt': return val * 25.4 / 72
-            if u in ('in', 'inch', 'inches'): return val * 25.4
-            if u == 'cm': return val * 10
-            if u == 'mm': return val
-            if u == 'px': return val / 96 * 25.4
-            return val / 96 * 25.4
-        scale_x = scale_y = 1.0
-        # Default: use width/height attributes for real-world size
-        w_val = h_val = view_w = view_h = None
-        w_unit = h_unit = None
-        if width_attr and height_attr:
-            w_val, w_unit = parse_length(width_attr)
-            h_val, h_unit = parse_length(height_attr)
-        if viewBox:
-            parts = viewBox.strip().split()
-            if len(parts) == 4:
-                view_w = float(parts[2])
-                view_h = float(parts[3])
-        # If both width/height and viewBox are present, use them for scaling
-        if w_val and h_val and view_w and view_h:
-            width_mm = to_mm(w_val, w_unit)
-            height_mm = to_mm(h_val, h_unit)
-            scale_x = width_mm / view_w
-            scale_y = height_mm / view_h
-        # If only width/height, fallback to old logic
-        elif w_val and h_val:
-            width_mm = to_mm(w_val, w_unit)
-            height_mm = to_mm(h_val, h_unit)
-            scale_x = width_mm / w_val
-            scale_y = height_mm / h_val
-        # If only viewBox, treat as points (Illustrator default)
-        elif view_w and view_h:
-            scale_x = 25.4 / 72
-            scale_y = 25.4 / 72
-        # --- END scale calculation ---
-        for idx, elem in enumerate(root.findall('.//{http://www.w3.org/2000/svg}path'), start=1):
-            d = elem.get('d')
-            if not d:
-                continue
-            svg_path = parse_path(d)
-            polygons = []
-            for subpath in svg_path.continuous_subpaths():
-                coords = [seg.start for seg in subpath]
-                if coords and coords[0] != coords[-1]:
-                    coords.append(subpath[-1].end)
-                # --- scale to mm ---
-                coords = [(pt.real * scale_x, pt.imag * scale_y) for pt in coords]
-                if len(coords) >= 3:
-                    polygons.append(Polygon(coords))
-            if not polygons:
-                continue
-            from shapely.ops import unary_union
-            poly = unary_union(polygons)
-            name = Path(dxf_path).stem
-            shapes.append((name, poly))
-        return shapes
-    doc = ezdxf.readfile(dxf_path)
-    pieces = collect_polygons(doc, wanted_layers)
-    from shapely.ops import unary_union
+SVG_NS = '{http://www.w3.org/2000/svg}'
+
+def _parse_length(s):
+    """Split an SVG length such as '210mm' into (210.0, 'mm')."""
+    m = re.match(r'\s*([0-9]*\.?[0-9]+)([a-zA-Z%]*)', s or '')
+    if not m:
+        return None, None
+    return float(m.group(1)), m.group(2)
+
+def _length_to_mm(val, unit):
+    u = unit.lower()
+    # blank unit implies points (Illustrator uses points)
+    if u in ('', 'pt'):
+        return val * 25.4 / 72
+    if u in ('in', 'inch', 'inches'):
+        return val * 25.4
+    if u == 'cm':
+        return val * 10
+    if u == 'mm':
+        return val
+    # pixels (CSS px at 96 ppi), also the fallback
+    return val / 96 * 25.4
+
+def svg_artboard(root) -> dict:
+    """Artboard size in mm and user-unit → mm scale for an <svg> root.
+
+    width_mm/height_mm come from the width/height attributes, falling back to
+    the viewBox read as points (None when neither exists).  scale_x/scale_y
+    map path coordinates to mm: width/height over the viewBox when both are
+    present, the unit factor of width/height alone, or points for a bare
+    viewBox.
+    """
+    view_w = view_h = None
+    vb = root.get('viewBox')
+    if vb:
+        parts = re.split(r'[\s,]+', vb.strip())
+        if len(parts) == 4:
+            view_w, view_h = float(parts[2]), float(parts[3])
+    w_val, w_unit = _parse_length(root.get('width'))
+    h_val, h_unit = _parse_length(root.get('height'))
+    width_mm = _length_to_mm(w_val, w_unit) if w_val is not None else None
+    height_mm = _length_to_mm(h_val, h_unit) if h_val is not None else None
+    scale_x = scale_y = 1.0
+    if w_val and h_val and view_w and view_h:
+        scale_x, scale_y = width_mm / view_w, height_mm / view_h
+    elif w_val and h_val:
+        scale_x, scale_y = width_mm / w_val, height_mm / h_val
+    elif view_w and view_h:
+        scale_x = scale_y = 25.4 / 72
+    if (width_mm is None or height_mm is None) and view_w is not None and view_h is not None:
+        width_mm, height_mm = view_w * 25.4 / 72, view_h * 25.4 / 72
+    return {'width_mm': width_mm, 'height_mm': height_mm,
+            'scale_x': scale_x, 'scale_y': scale_y}
+
+def read_svg(svg_path: str, fidelity: Fidelity = Fidelity()):
+    """Parse an SVG once; returns (shapes, artboard) in mm.
+
+    shapes is [(name, geometry)] with one entry per <path>, curves flattened
+    and outlines simplified to *fidelity*; artboard is the `svg_artboard` dict.
+    """
+    import xml.etree.ElementTree as ET
+    from svgpathtools import parse_path
+    root = ET.parse(svg_path).getroot()
+    artboard = svg_artboard(root)
+    scale_x, scale_y = artboard['scale_x'], artboard['scale_y']
+    name = Path(svg_path).stem
+    # flatten every curve of every path in one batch, in user units
+    tol = fidelity.flatten / max(scale_x, scale_y, 1e-9)
+    cubics, chain_lengths, chain_path = [], [], []
+    n_paths = 0
+    for elem in root.iter(SVG_NS + 'path'):
+        d = elem.get('d')
+        if not d:
+            continue
+        for subpath in parse_path(d).continuous_subpaths():
+            chain = [c for seg in subpath for c in _svg_segment_cubics(seg, tol)]
+            if chain:
+                cubics.extend(chain)
+                chain_lengths.append(len(chain))
+                chain_path.append(n_paths)
+        n_paths += 1
+    polygons = [[] for _ in range(n_paths)]
+    shapes = []
+    if cubics:
+        ctrl = np.asarray(cubics, dtype=complex)
+        ctrl = np.stack((ctrl.real, ctrl.imag), axis=-1)
+        lines = flatten_chains(ctrl, chain_lengths, tol)
+        for path_idx, coords in zip(chain_path, lines):
+            if np.array_equal(coords[0], coords[-1]):
+                coords = coords[:-1]
+            # scale to mm
+            coords = coords * (scale_x, scale_y)
+            if len(coords) >= 3:
+                poly = Polygon(coords)
+                if fidelity.simplify:
+                    poly = poly.simplify(fidelity.simplify, preserve_topology=True)
+                polygons[path_idx].append(poly)
+    for polys in polygons:
+        if polys:
+            shapes.append((name, shapely.union_all(polys)))
+    return shapes, artboard
+
+def ingest(dxf_path: str, wanted_layers=None, unit_scale: float = 1.0,
+           fidelity: Fidelity = Fidelity()):
+    """Parse a DXF or SVG once; returns (shapes, meta).
+    meta holds the SVG artboard (see `svg_artboard`) and is empty for DXF."""
+    if Path(dxf_path).suffix.lower() == '.svg':
+        with metrics.span('svg_parse'):
+            return read_svg(dxf_path, fidelity)
+    return list_shapes(dxf_path, wanted_layers, unit_scale, fidelity), {}
+
+def list_shapes(dxf_path: str, wanted_layers=None, unit_scale: float = 1.0,
+                fidelity: Fidelity = Fidelity()):
+    """List named shape polygons from a DXF or SVG file.
+    *fidelity* (mm) sets curve flattening, simplification and gap healing."""
+    if Path(dxf_path).suffix.lower() == '.svg':
+        with metrics.span('svg_parse'):
+            return read_svg(dxf_path, fidelity)[0]
+    pieces = read_polygons(dxf_path, wanted_layers, fidelity.scaled(unit_scale))
     grouped = {}
     for name, poly in pieces:
         grouped.setdefault(name, []).append(poly)
     result = []
-    for name, polys in grouped.items():
-        merged = unary_union(polys) if len(polys) > 1 else polys[0]
-        result.append((name, merged))
+    with metrics.span('union'):
+        for name, polys in grouped.items():
+            merged = shapely.union_all(polys) if len(polys) > 1 else polys[0]
+            result.append((name, merged))
+    if metrics.enabled:
+        metrics.count('vertices_total', int(sum(shapely.get_num_coordinates(p) for _, p in result)),
+                      stage='shapes')
     # Scale DXF shapes to millimeters based on unit_scale
     if unit_scale != 1.0:
         from shapely.affinity import scale as _scale_geom
         result = [(name, _scale_geom(poly, xfact=unit_scale, yfact=unit_scale, origin=(0, 0))) for name, poly in result]
     return result
 
-def polygon_to_svg(poly, path: str, stroke='none', fill='black', stroke_width=0):
-    """Write a simple SVG file rendering the filled Polygon."""
+# ---------------------------------------------------------------------------
+# parsed-geometry cache ------------------------------------------------------
+
+SHAPE_CACHE_SIZE = 32   # parsed files kept in memory
+_shape_lru = OrderedDict()
+_digests = {}
+_cache_lock = threading.Lock()
+
+def file_digest(path) -> str:
+    """SHA-1 of the file contents, memoized on (path, size, mtime)."""
+    st = os.stat(path)
+    stamp = (str(path), st.st_size, st.st_mtime_ns)
+    digest = _digests.get(stamp)
+    if digest is None:
+        h = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        digest = _digests[stamp] = h.hexdigest()
+    return digest
+
+def remember_digest(path, digest):
+    """Seed the file_digest memo for a file whose hash is already known,
+    e.g. one hashed while it was being uploaded."""
+    st = os.stat(path)
+    _digests[(str(path), st.st_size, st.st_mtime_ns)] = digest
+
+def _shape_cache_key(path, wanted_layers, unit_scale, fidelity=Fidelity()) -> str:
+    # SVG geometry is scaled from its own artboard, so unit_scale is moot
+    if Path(path).suffix.lower() == '.svg':
+        unit_scale = 1.0
+    layers = ','.join(sorted(wanted_layers)) if wanted_layers else ''
+    params = f"{float(unit_scale)!r}|{layers}|{fidelity.key()}"
+    params = hashlib.sha1(params.encode()).hexdigest()
+    return f"{file_digest(path)[:16]}_{params[:8]}"
+
+def _write_shapes_wkb(path: Path, shapes, meta=None):
+    """Store [(name, geom)] and *meta* as a JSON header line followed by WKB blobs."""
+    blobs = [shapely.to_wkb(geom) for _, geom in shapes]
+    header = {'names': [name for name, _ in shapes],
+              'sizes': [len(b) for b in blobs],
+              'meta': meta or {}}
+    with _replace_atomically(path) as f:
+        f.write(json.dumps(header).encode('utf-8') + b'\n')
+        for blob in blobs:
+            f.write(blob)
+
+def _read_shapes_wkb(path: Path):
+    with open(path, 'rb') as f:
+        header = json.loads(f.readline())
+        data = f.read()
+    shapes, pos = [], 0
+    for name, size in zip(header['names'], header['sizes']):
+        shapes.append((name, shapely.from_wkb(data[pos:pos + size])))
+        pos += size
+    return shapes, header.get('meta', {})
+
+def load_ingest(dxf_path: str, wanted_layers=None, unit_scale: float = 1.0,
+                fidelity: Fidelity = Fidelity()):
+    """Cached `ingest`: returns (shapes, meta).
+
+    Parsed shapes and metadata are written as WKB next to the input file,
+    keyed by its content hash plus *unit_scale*, *wanted_layers* and
+    *fidelity*, with an
+    in-process LRU in front, so repeat requests on an upload skip parsing
+    entirely.
+    """
+    key = _shape_cache_key(dxf_path, wanted_layers, unit_scale, fidelity)
+    with _cache_lock:
+        hit = _shape_lru.get(key)
+        if hit is not None:
+            _shape_lru.move_to_end(key)
+            metrics.count('shape_cache_total', result='memory')
+            return hit
+    wkb_path = Path(dxf_path).parent / f"shapes_{key}.wkb"
+    try:
+        with metrics.span('shape_cache_read'):
+            hit = _read_shapes_wkb(wkb_path)
+        metrics.count('shape_cache_total', result='disk')
+        logger.debug("Loaded %d cached shape(s) from %s", len(hit[0]), wkb_path)
+    except (OSError, ValueError):
+        metrics.count('shape_cache_total', result='miss')
+        hit = ingest(dxf_path, wanted_layers, unit_scale, fidelity)
+        try:
+            _write_shapes_wkb(wkb_path, *hit)
+        except OSError as exc:
+            logger.warning("Could not write shape cache %s: %s", wkb_path, exc)
+    with _cache_lock:
+        _shape_lru[key] = hit
+        _shape_lru.move_to_end(key)
+        while len(_shape_lru) > SHAPE_CACHE_SIZE:
+            _shape_lru.popitem(last=False)
+    return hit
+
+def load_shapes(dxf_path: str, wanted_layers=None, unit_scale: float = 1.0,
+                fidelity: Fidelity = Fidelity()):
+    """Cached `list_shapes` (see `load_ingest`)."""
+    return load_ingest(dxf_path, wanted_layers, unit_scale, fidelity)[0]
+
+# ---------------------------------------------------------------------------
+# compact SVG path data ------------------------------------------------------
+
+SVG_PRECISION = 3  # decimals kept in full-detail path data
+
+def _svg_num(n: int, digits: int) -> str:
+    """Format n * 10**-digits without trailing zeros or a leading 0."""
+    if not digits:
+        return str(n)
+    sign = '-' if n < 0 else ''
+    text = str(abs(n)).rjust(digits + 1, '0')
+    whole, frac = text[:-digits], text[-digits:].rstrip('0')
+    if not frac:
+        return sign + whole
+    return f"{sign}{'' if whole == '0' else whole}.{frac}"
+
+def _svg_numbers(nums, digits: int) -> str:
+    out = []
+    for n in nums:
+        text = _svg_num(int(n), digits)
+        # a minus sign separates numbers on its own
+        if out and not text.startswith('-'):
+            out.append(' ')
+        out.append(text)
+    return ''.join(out)
+
+def lod_tolerance(geom, lod: int) -> float:
+    """Size of one screen pixel when *geom* is drawn *lod* pixels across."""
+    minx, miny, maxx, maxy = geom.bounds
+    return max(maxx - minx, maxy - miny) / lod
+
+def svg_path_data(geom, lod: int = None) -> str:
+    """Compact SVG path data for a Polygon/MultiPolygon, holes included.
+
+    Every ring becomes a relative subpath (``m`` / ``l`` / ``z``) over
+    coordinates snapped to an integer grid, so deltas never drift, with
+    trailing zeros trimmed and repeated points dropped.  Render it with
+    ``fill-rule="evenodd"``.  With *lod* (target width in pixels) the
+    geometry is first simplified, topology preserved, to one pixel and the
+    precision lowered to match.
+    """
+    digits = SVG_PRECISION
+    if lod and not geom.is_empty:
+        tol = lod_tolerance(geom, lod)
+        if tol > 0:
+            geom = geom.simplify(tol, preserve_topology=True)
+            digits = min(SVG_PRECISION, max(0, math.ceil(-math.log10(tol / 2))))
+    scale = 10 ** digits
+    parts = []
+    cursor = None
+    for ring in shapely.get_rings(shapely.get_parts(geom)):
+        pts = np.rint(shapely.get_coordinates(ring) * scale).astype(np.int64)
+        # drop the closing vertex and points that collapse onto the previous one
+        pts = pts[:-1]
+        if len(pts):
+            keep = np.ones(len(pts), dtype=bool)
+            keep[1:] = (np.diff(pts, axis=0) != 0).any(axis=1)
+            pts = pts[keep]
+        if len(pts) > 1 and (pts[-1] == pts[0]).all():
+            pts = pts[:-1]
+        if len(pts) < 3:
+            continue
+        move = f"m{_svg_numbers(pts[0] - cursor, digits)}" if parts else \
+            f"M{_svg_numbers(pts[0], digits)}"
+        deltas = np.diff(pts, axis=0).ravel()
+        parts.append(f"{move}l{_svg_numbers(deltas, digits)}z")
+        # after 'z' the current point is back at the subpath start
+        cursor = pts[0]
+    return ''.join(parts)
+
+def polygon_to_svg(poly, path: str, stroke='none', fill='black', stroke_width=0,
+                   lod: int = None):
+    """Write a simple SVG file rendering the filled Polygon/MultiPolygon.
+    *lod* simplifies the outline for display at that many pixels across."""
     from xml.etree.ElementTree import Element, SubElement, tostring
     minx, miny, maxx, maxy = poly.bounds
     width = maxx - minx
@@ -462,27 +1169,89 @@ def polygon_to_svg(poly, path: str, stroke='none', fill='black', stroke_width=0)
     root = Element('svg', xmlns='http://www.w3.org/2000/svg',
                    viewBox=f"{minx} {miny} {width} {height}",
                    width=f"{width}mm", height=f"{height}mm")
-    coords = " ".join(f"{x:.3f},{y:.3f}" for x, y in poly.exterior.coords)
-    path_d = f"M {coords} Z"
-    # Draw filled shape
-    el = SubElement(root, 'path', d=path_d, stroke=stroke, fill=fill)
+    # Draw filled shape; holes are cut out by the even-odd rule
+    el = SubElement(root, 'path', d=svg_path_data(poly, lod), stroke=stroke, fill=fill)
+    el.set('fill-rule', 'evenodd')
     if stroke_width:
         el.set('stroke-width', str(stroke_width))
     with open(path, 'wb') as f:
         f.write(tostring(root))
 
-def convert_one(dxf_path: str, out_dir: str, sts10: float, rows10: float,
-                wanted_layers=None, unit_scale: float=1.0,
-                piece_index: int=1, rotation: float=0.0, mirror: str="none",
-                garter_mode: bool=False, add_transfers: bool=False,
-                full_cardigan: bool=False, half_cardigan: bool=False):
-    """Convert a single named shape (by index) from DXF to DAK txt."""
-    shapes = list_shapes(dxf_path, wanted_layers, unit_scale)
-    if not shapes or piece_index < 1 or piece_index > len(shapes):
-        return []
-    name, base_poly = shapes[piece_index - 1]
-    # Apply rotation and mirror, then union shapes for final outline
-    from shapely.affinity import rotate as _rotate_geom, scale as _scale_geom
+def preview_sprite(shapes, lod: int = None):
+    """One SVG document previewing every shape; returns (svg_bytes, index).
+
+    Each piece is a ``<symbol id="shape-N">`` drawn once by a ``<use>``.
+    Pieces are stacked top to bottom, a clear gap apart, and each is framed by
+    ``<view id="piece-N">``, so ``<img src="sprite.svg#piece-N">`` shows just
+    that piece and every image shares one download.  *index* lists
+    {idx, name, id, bounds, width, height} per piece in drawing units.
+    """
+    from xml.etree.ElementTree import Element, SubElement, tostring
+    boxes = [poly.bounds for _, poly in shapes]
+    # letterboxing a view never reaches the next piece
+    gap = max((max(maxx - minx, maxy - miny) for minx, miny, maxx, maxy in boxes), default=0)
+    root = Element('svg', xmlns='http://www.w3.org/2000/svg')
+    index, y, full_width = [], 0.0, 0.0
+    for idx, ((name, poly), bounds) in enumerate(zip(shapes, boxes), start=1):
+        minx, miny, maxx, maxy = bounds
+        width, height = maxx - minx, maxy - miny
+        symbol = SubElement(root, 'symbol', id=f"shape-{idx}",
+                            viewBox=f"{minx} {miny} {width} {height}")
+        el = SubElement(symbol, 'path', d=svg_path_data(poly, lod), fill='black')
+        el.set('fill-rule', 'evenodd')
+        SubElement(root, 'use', href=f"#shape-{idx}", x='0', y=f"{y}",
+                   width=f"{width}", height=f"{height}")
+        SubElement(root, 'view', id=f"piece-{idx}", viewBox=f"0 {y} {width} {height}")
+        index.append({'idx': idx, 'name': name, 'id': f"piece-{idx}",
+                      'bounds': bounds, 'width': width, 'height': height})
+        full_width = max(full_width, width)
+        y += height + gap
+    root.set('viewBox', f"0 0 {full_width} {max(y - gap, 0)}")
+    return tostring(root), index
+
+# Rasterized grids per (piece, transform, gauge): an in-process LRU in front
+# of grid_<key>.npz files in the output folder
+GRID_VERSION = 2        # bump when rasterizing changes
+GRID_CACHE_SIZE = 64
+_grid_lru = OrderedDict()
+
+def _grid_key(shape_key: str, piece_index: int, rotation, mirror, sts10, rows10,
+              heal) -> str:
+    key = (f"{GRID_VERSION}|{shape_key}|{piece_index}|{float(rotation)!r}|{mirror}|"
+           f"{float(sts10)!r}|{float(rows10)!r}|{float(heal)!r}")
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+def load_grid(key: str, out_dir: str, build):
+    """Return the StitchGrid cached under *key*, else `build()` and cache it."""
+    with _cache_lock:
+        grid = _grid_lru.get(key)
+        if grid is not None:
+            _grid_lru.move_to_end(key)
+            metrics.count('grid_cache_total', result='memory')
+            return grid
+    npz_path = Path(out_dir) / f"grid_{key}.npz"
+    try:
+        grid = StitchGrid.load(npz_path)
+        metrics.count('grid_cache_total', result='disk')
+    except (OSError, ValueError, KeyError):
+        metrics.count('grid_cache_total', result='miss')
+        grid = build()
+        try:
+            grid.save(npz_path)
+        except OSError as exc:
+            logger.warning("Could not write grid cache %s: %s", npz_path, exc)
+    with _cache_lock:
+        _grid_lru[key] = grid
+        _grid_lru.move_to_end(key)
+        while len(_grid_lru) > GRID_CACHE_SIZE:
+            _grid_lru.popitem(last=False)
+    return grid
+
+def _shape_grid(base_poly, sts10: float, rows10: float, rotation: float=0.0,
+                mirror: str="none", heal: float=TOL):
+    """Rotate/mirror one parsed shape and rasterize it to a StitchGrid."""
+    from shapely.affinity import rotate as _rotate_geom
+    t0 = time.perf_counter()
     # Rotation around center of base shape
     minx, miny, maxx, maxy = base_poly.bounds
     center = ((minx + maxx) / 2, (miny + maxy) / 2)
@@ -490,40 +1259,137 @@ def convert_one(dxf_path: str, out_dir: str, sts10: float, rows10: float,
         rotated = _rotate_geom(base_poly, rotation, origin=center)
     else:
         rotated = base_poly
-    # Build list of polygons to merge: rotated shape always present
-    polys_to_merge = [rotated]
-    # If mirroring, create mirrored copy of rotated shape
+    metrics.record('transform', time.perf_counter() - t0)
+    # Mirror about the left or right edge of the rotated bounding box in
+    # raster space: scan the half once and reflect its spans
     if mirror in ('left', 'right'):
-        # Mirror about left or right edge of rotated shape's bounding box
-        minx2, miny2, maxx2, maxy2 = rotated.bounds
-        cy = (miny2 + maxy2) / 2
-        origin = (minx2, cy) if mirror == 'left' else (maxx2, cy)
-        mirrored = _scale_geom(rotated, xfact=-1, yfact=1, origin=origin)
-        polys_to_merge.append(mirrored)
-    # Union all pieces into final polygon or multipolygon
+        with metrics.span('rasterize'):
+            return mirrored_grid(rotated, sts10, rows10, mirror, heal)
+    # close small gaps in the outline
     from shapely.ops import unary_union
-    poly = unary_union(polys_to_merge)
-    # close small gaps between mirrored/rotated parts
-    poly = poly.buffer(TOL).buffer(-TOL)
-    from pathlib import Path
+    poly = unary_union([rotated]).buffer(heal).buffer(-heal)
+    with metrics.span('rasterize'):
+        return scanline_grid(poly, sts10, rows10)
+
+def _convert_shape(name: str, base_poly, out_dir: str, piece_index: int,
+                   sts10: float, rows10: float, rotation: float=0.0,
+                   mirror: str="none", garter_mode: bool=False,
+                   add_transfers: bool=False, full_cardigan: bool=False,
+                   half_cardigan: bool=False, yarn: int=4, heal: float=TOL,
+                   grid_key: str=None, grid_dir: str=None) -> str:
+    """Transform, rasterize and write one parsed shape; returns the txt path.
+    With a *grid_key* the grid comes from `load_grid` (stored in *grid_dir*,
+    default *out_dir*), so a change of stitch mode or yarn alone only
+    re-runs the writer."""
+    def build():
+        return _shape_grid(base_poly, sts10, rows10, rotation, mirror, heal)
+    grid = load_grid(grid_key, grid_dir or out_dir, build) if grid_key else build()
     fname = name.replace(" ", "_")
     txt_path = Path(out_dir) / f"{piece_index}_{fname}.txt"
-    counts = list(row_stitch_counts(poly, sts10, rows10))
-    _write_shape(txt_path, name, fname, counts, sts10, rows10,
-                 garter_mode=garter_mode, add_transfers=add_transfers,
-                 full_cardigan=full_cardigan, half_cardigan=half_cardigan)
-    return [str(txt_path)]
+    with metrics.span('write_shape'):
+        _write_shape(txt_path, name, fname, grid, sts10, rows10,
+                     garter_mode=garter_mode, add_transfers=add_transfers,
+                     full_cardigan=full_cardigan, half_cardigan=half_cardigan,
+                     yarn=yarn)
+    return str(txt_path)
+
+def convert_one(dxf_path: str, out_dir: str, sts10: float, rows10: float,
+                wanted_layers=None, unit_scale: float=1.0,
+                piece_index: int=1, rotation: float=0.0, mirror: str="none",
+                garter_mode: bool=False, add_transfers: bool=False,
+                full_cardigan: bool=False, half_cardigan: bool=False,
+                yarn: int=4, cache: bool=False, fidelity: Fidelity=None):
+    """Convert a single named shape (by index) from DXF to DAK txt.
+    With *cache*, parsed shapes are reused via `load_shapes` and stitch
+    grids via `load_grid`, both stored next to the input file.  *fidelity*
+    defaults to `gauge_fidelity(sts10, rows10)`.
+    """
+    fidelity = fidelity or gauge_fidelity(sts10, rows10)
+    if cache:
+        shapes = load_shapes(dxf_path, wanted_layers, unit_scale, fidelity)
+    else:
+        shapes = list_shapes(dxf_path, wanted_layers, unit_scale, fidelity)
+    if not shapes or piece_index < 1 or piece_index > len(shapes):
+        return []
+    name, base_poly = shapes[piece_index - 1]
+    grid_key = None
+    if cache:
+        grid_key = _grid_key(_shape_cache_key(dxf_path, wanted_layers, unit_scale, fidelity),
+                             piece_index, rotation, mirror, sts10, rows10, fidelity.heal)
+    return [_convert_shape(name, base_poly, out_dir, piece_index, sts10, rows10,
+                           rotation=rotation, mirror=mirror,
+                           garter_mode=garter_mode, add_transfers=add_transfers,
+                           full_cardigan=full_cardigan,
+                           half_cardigan=half_cardigan, yarn=yarn,
+                           heal=fidelity.heal, grid_key=grid_key,
+                           grid_dir=str(Path(dxf_path).parent))]
+
+def convert_many(dxf_path: str, out_dir: str, sts10: float, rows10: float,
+                 piece_indices=None, wanted_layers=None, unit_scale: float=1.0,
+                 cache: bool=False, fidelity: Fidelity=None, **options):
+    """Convert several shapes (default: all) with shared settings.
+
+    The file is parsed once; yields (piece_index, name, txt_path, error) as
+    each piece finishes so callers can stream results.  *options* are the
+    rotation/mirror/stitch-mode/yarn keywords of `convert_one`; *cache*
+    works as there.
+    """
+    fidelity = fidelity or gauge_fidelity(sts10, rows10)
+    if cache:
+        shapes = load_shapes(dxf_path, wanted_layers, unit_scale, fidelity)
+    else:
+        shapes = list_shapes(dxf_path, wanted_layers, unit_scale, fidelity)
+    shape_key = _shape_cache_key(dxf_path, wanted_layers, unit_scale, fidelity) if cache else None
+    if piece_indices is None:
+        piece_indices = range(1, len(shapes) + 1)
+    for piece_index in piece_indices:
+        if piece_index < 1 or piece_index > len(shapes):
+            yield piece_index, None, None, "Shape not found"
+            continue
+        name, base_poly = shapes[piece_index - 1]
+        grid_key = None
+        if cache:
+            grid_key = _grid_key(shape_key, piece_index, options.get('rotation', 0.0),
+                                 options.get('mirror', 'none'), sts10, rows10,
+                                 fidelity.heal)
+        try:
+            txt_path = _convert_shape(name, base_poly, out_dir, piece_index,
+                                      sts10, rows10, heal=fidelity.heal,
+                                      grid_key=grid_key,
+                                      grid_dir=str(Path(dxf_path).parent), **options)
+        except Exception as exc:
+            logger.exception("Piece %d (%s) failed", piece_index, name)
+            yield piece_index, name, None, f"{type(exc).__name__}: {exc}"
+            continue
+        yield piece_index, name, txt_path, None
 
 # ---------------------------------------------------------------------------
 # public API -----------------------------------------------------------------
 
-def convert(dxf_path: str, out_dir: str, sts10: float, rows10: float, wanted_layers: Iterable[str]=None, unit_scale: float=1.0):
-    """Convert *dxf_path* to one .txt per closed outline in *out_dir*.
-    Returns list[str] of generated files.
+PARALLEL_MIN_PIECES = 4  # below this a process pool costs more than it saves
+
+def _convert_piece(job):
+    """Rasterize and write one piece; runs in the parent or a pool worker.
+
+    *job* is (idx, name, wkb, out_dir, sts10, rows10) so the geometry crosses
+    process boundaries as WKB.  Returns (path, None) or (None, error) so one
+    bad outline never takes down the rest of the batch.
     """
-    logger.info("Converting DXF %s", dxf_path)
-    doc = ezdxf.readfile(dxf_path)
-    pieces = collect_polygons(doc, wanted_layers)
+    idx, name, wkb, out_dir, sts10, rows10 = job
+    try:
+        poly = shapely.from_wkb(wkb)
+        fname = name.replace(" ", "_")
+        # Name each shape file uniquely by index and layer name
+        txt_path = Path(out_dir) / f"{idx}_{fname}.txt"
+        grid = scanline_grid(poly, sts10, rows10)
+        _write_shape(txt_path, name, fname, grid, sts10, rows10)
+        return str(txt_path), None
+    except Exception as exc:
+        return None, f"{type(exc).__name__}: {exc}"
+
+def _dxf_pieces(dxf_path: str, wanted_layers, unit_scale: float, fidelity: Fidelity):
+    """Outlines of a DXF in mm, grouped and unioned by piece name."""
+    pieces = read_polygons(dxf_path, wanted_layers, fidelity.scaled(unit_scale))
     # Scale polygon geometries from drawing units to mm
     if unit_scale != 1.0 and pieces:
         from shapely.affinity import scale as _scale_geom
@@ -533,27 +1399,69 @@ def convert(dxf_path: str, out_dir: str, sts10: float, rows10: float, wanted_lay
         ]
     logger.info("Detected %d raw shapes", len(pieces))
     # Group multiple polygons by piece name into single shapes
-    from shapely.ops import unary_union
     grouped = {}
     for name, poly in pieces:
         grouped.setdefault(name, []).append(poly)
     pieces = []
-    for name, polys_list in grouped.items():
-        merged_poly = unary_union(polys_list) if len(polys_list) > 1 else polys_list[0]
-        pieces.append((name, merged_poly))
+    with metrics.span('union'):
+        for name, polys_list in grouped.items():
+            merged_poly = shapely.union_all(polys_list) if len(polys_list) > 1 else polys_list[0]
+            pieces.append((name, merged_poly))
     logger.info("Grouped into %d shapes", len(pieces))
+    return pieces
+
+class PartialConversion(Exception):
+    """Raised by `convert(strict=True)` when some pieces failed.  *created*
+    holds the files that were written; *errors* is (idx, name, error) per
+    failed piece."""
+
+    def __init__(self, created, errors):
+        self.created, self.errors = created, errors
+        super().__init__("; ".join(f"piece {idx} ({name}): {error}"
+                                   for idx, name, error in errors))
+
+def convert(dxf_path: str, out_dir: str, sts10: float, rows10: float, wanted_layers: Iterable[str]=None, unit_scale: float=1.0,
+            workers: int=1, fidelity: Fidelity=None, strict: bool=False):
+    """Convert *dxf_path* (DXF or SVG) to one .txt per closed outline in
+    *out_dir*.  Returns list[str] of generated files, in piece order.
+    *fidelity* defaults to `gauge_fidelity(sts10, rows10)`.
+
+    With *workers* > 1 and at least PARALLEL_MIN_PIECES pieces, pieces are
+    rasterized in a process pool.  Pieces that fail are logged and skipped,
+    or, with *strict*, reported by raising `PartialConversion` once the rest
+    have been written.
+    """
+    logger.info("Converting %s", dxf_path)
+    fidelity = fidelity or gauge_fidelity(sts10, rows10)
+    if Path(dxf_path).suffix.lower() == '.svg':
+        # every SVG <path> is its own piece, already in mm
+        with metrics.span('svg_parse'):
+            pieces = read_svg(dxf_path, fidelity)[0]
+    else:
+        pieces = _dxf_pieces(dxf_path, wanted_layers, unit_scale, fidelity)
     if not pieces:
         logger.warning("No shapes found in %s", dxf_path)
         return []
 
     out_p = Path(out_dir); out_p.mkdir(parents=True, exist_ok=True)
-    created = []
-    for idx, (name, poly) in enumerate(pieces, 1):
-        fname = name.replace(" ", "_")
-        # Name each shape file uniquely by index and layer name
-        txt_path = out_p / f"{idx}_{fname}.txt"
-        counts = list(row_stitch_counts(poly, sts10, rows10))
-        _write_shape(txt_path, name, fname, counts, sts10, rows10)
-        created.append(str(txt_path))
+    jobs = [(idx, name, shapely.to_wkb(poly), str(out_p), sts10, rows10)
+            for idx, (name, poly) in enumerate(pieces, 1)]
+    if workers and workers > 1 and len(jobs) >= PARALLEL_MIN_PIECES:
+        from concurrent.futures import ProcessPoolExecutor
+        logger.info("Converting %d pieces with %d workers", len(jobs), workers)
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            # map() yields results in submission order
+            results = list(pool.map(_convert_piece, jobs))
+    else:
+        results = [_convert_piece(job) for job in jobs]
+    created, errors = [], []
+    for (idx, name, *_), (txt_path, error) in zip(jobs, results):
+        if error:
+            logger.error("Piece %d (%s) failed: %s", idx, name, error)
+            errors.append((idx, name, error))
+            continue
+        created.append(txt_path)
         logger.debug("Wrote %s", txt_path)
-    return created
\ No newline at end of file
+    if strict and errors:
+        raise PartialConversion(created, errors)
+    return created
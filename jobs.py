@@ -0,0 +1,144 @@
+"""jobs.py – background job queue for long-running conversions.
+
+`make_queue(backend, **options)` returns a queue with `submit(fn, *args,
+**kwargs) -> job_id` and `status(job_id) -> dict | None`.  Backends are
+registered in BACKENDS; the in-process one runs jobs on a bounded thread pool
+and suits tests and single-box deploys.
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised by `submit` when the queue is at its configured depth."""
+
+
+class JobQueue:
+    """Interface every queue backend implements."""
+
+    def submit(self, fn, *args, **kwargs) -> str:
+        raise NotImplementedError
+
+    def status(self, job_id: str):
+        """Return a dict with id/status/result/error/timings, or None.
+        With metrics enabled, ``stages`` maps stage name to seconds."""
+        raise NotImplementedError
+
+
+class InProcessQueue(JobQueue):
+    """Run jobs on a local thread pool.
+
+    At most *workers* jobs run and *max_queued* wait; further submissions
+    raise QueueFull.  A job still queued after *time_budget* seconds is
+    cancelled, and one running longer is reported as ``timeout`` with its
+    result discarded (Python threads cannot be killed, so the work itself
+    runs to completion in the background and keeps counting against the
+    bound until it does).  The newest *keep* finished jobs stay queryable.
+    """
+
+    ACTIVE = ('queued', 'running')
+
+    def __init__(self, workers: int = 2, max_queued: int = 16,
+                 time_budget: float = 120.0, keep: int = 256):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.time_budget = time_budget
+        self.keep = keep
+        self._pool = ThreadPoolExecutor(max_workers=workers,
+                                        thread_name_prefix='job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs) -> str:
+        with self._lock:
+            self._expire()
+            active = sum(1 for job in self._jobs.values() if self._occupied(job))
+            if active >= self.workers + self.max_queued:
+                raise QueueFull(f"{active} jobs pending")
+            job_id = uuid.uuid4().hex
+            job = {'id': job_id, 'status': 'queued', 'submitted': time.time(),
+                   'started': None, 'finished': None, 'result': None,
+                   'error': None, 'stages': None, 'future': None}
+            self._jobs[job_id] = job
+            job['future'] = self._pool.submit(self._run, job, fn, args, kwargs)
+            self._prune()
+        logger.debug("Queued job %s (%s)", job_id, getattr(fn, '__name__', fn))
+        return job_id
+
+    def _run(self, job, fn, args, kwargs):
+        with self._lock:
+            if job['status'] != 'queued':
+                return
+            job['status'] = 'running'
+            job['started'] = time.time()
+        metrics.begin_request()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as exc:
+            logger.exception("Job %s failed", job['id'])
+            outcome, result, error = 'failed', None, f"{type(exc).__name__}: {exc}"
+        else:
+            outcome, error = 'done', None
+        stages = {stage: round(seconds, 6) for stage, seconds in metrics.end_request()}
+        with self._lock:
+            job['finished'] = time.time()
+            job['stages'] = stages or None
+            if job['status'] != 'running':
+                return  # timed out while running; drop the late result
+            if job['finished'] - job['started'] > self.time_budget:
+                outcome, result, error = 'timeout', None, "Time budget exceeded"
+            job['status'], job['result'], job['error'] = outcome, result, error
+
+    @staticmethod
+    def _occupied(job):
+        """True while the job holds a pool slot: queued, running, or timed
+        out but still executing."""
+        return not job['future'].done()
+
+    def _expire(self):
+        """Cancel queued jobs and time out running ones past the budget."""
+        now = time.time()
+        for job in self._jobs.values():
+            if job['status'] == 'queued' and now - job['submitted'] > self.time_budget:
+                job['future'].cancel()
+                job['status'], job['error'] = 'timeout', "Waited too long in queue"
+                job['finished'] = now
+            elif job['status'] == 'running' and now - job['started'] > self.time_budget:
+                job['status'], job['error'] = 'timeout', "Time budget exceeded"
+                job['finished'] = now
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job['status'] not in self.ACTIVE and not self._occupied(job)]
+        for job_id in finished[:max(0, len(finished) - self.keep)]:
+            del self._jobs[job_id]
+
+    def status(self, job_id: str):
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {k: v for k, v in job.items() if k != 'future'}
+
+
+BACKENDS = {
+    'inprocess': InProcessQueue,
+}
+
+
+def make_queue(backend: str = 'inprocess', **options) -> JobQueue:
+    """Instantiate the queue backend registered under *backend*."""
+    try:
+        cls = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown job backend {backend!r}; choose from {sorted(BACKENDS)}")
+    return cls(**options)
@@ -0,0 +1,169 @@
+"""metrics.py – lightweight stage timing and Prometheus text metrics.
+
+    with metrics.span('rasterize'):
+        ...
+
+Spans feed a per-stage histogram and, inside a request started with
+`begin_request`, the per-request breakdown that `end_request` returns (the
+app turns it into a Server-Timing header).  `count` adds to labelled
+counters such as entity and vertex totals.  `render` produces the Prometheus
+text exposition format.
+
+Everything is off until `enable()` is called; `span` then hands back one
+shared no-op context manager and `count` returns immediately, so
+instrumented code pays a single flag check.
+"""
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+
+PREFIX = 'kniterate'
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+           2.5, 5.0, 10.0, 30.0)
+
+enabled = False
+_NOOP = nullcontext()
+_lock = threading.Lock()
+# (metric, labels) -> [bucket counts..., sum, count]
+_histograms = {}
+# (metric, labels) -> value
+_counters = {}
+_request_spans = ContextVar('request_spans', default=None)
+
+HELP = {
+    'stage_seconds': 'Wall time per pipeline stage.',
+    'request_seconds': 'Wall time per route.',
+    'entities_total': 'DXF entities scanned, by type.',
+    'vertices_total': 'Outline vertices produced, by stage.',
+    'shape_cache_total': 'Parsed-shape cache lookups, by result.',
+    'grid_cache_total': 'Stitch-grid cache lookups, by result.',
+    'r2_upload_total': 'R2 uploads, by result (uploaded or skipped as existing).',
+}
+
+
+def enable(on: bool = True):
+    global enabled
+    enabled = bool(on)
+
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def observe(metric: str, seconds: float, **labels):
+    """Add one observation to histogram *metric*."""
+    key = (metric, _labels(labels))
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0] * len(BUCKETS) + [0.0, 0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                h[i] += 1
+        h[-2] += seconds
+        h[-1] += 1
+
+
+def count(metric: str, n=1, **labels):
+    """Add *n* to counter *metric*."""
+    if not enabled:
+        return
+    key = (metric, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+
+
+def record(stage: str, seconds: float):
+    """Record an already-measured *stage* like a finished span."""
+    if not enabled:
+        return
+    observe('stage_seconds', seconds, stage=stage)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((stage, seconds))
+
+
+class _Span:
+    __slots__ = ('stage', 't0')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.stage, time.perf_counter() - self.t0)
+        return False
+
+
+def span(stage: str):
+    """Context manager timing *stage*; a shared no-op while disabled."""
+    if not enabled:
+        return _NOOP
+    return _Span(stage)
+
+
+def begin_request():
+    """Start collecting spans for the current request (or job)."""
+    if enabled:
+        _request_spans.set([])
+
+
+def end_request():
+    """Stop collecting; returns [(stage, seconds)] summed per stage in first-seen order."""
+    spans = _request_spans.get()
+    _request_spans.set(None)
+    totals = {}
+    for stage, elapsed in spans or ():
+        totals[stage] = totals.get(stage, 0.0) + elapsed
+    return list(totals.items())
+
+
+def server_timing(stages, total: float = None) -> str:
+    """Format [(stage, seconds)] as a Server-Timing header value (ms)."""
+    parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in stages]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.2f}")
+    return ', '.join(parts)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _fmt_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def render() -> str:
+    """Prometheus text exposition of every histogram and counter."""
+    with _lock:
+        histograms = {k: list(v) for k, v in _histograms.items()}
+        counters = dict(_counters)
+    lines = []
+    for metric in sorted({m for m, _ in histograms}):
+        name = f"{PREFIX}_{metric}"
+        lines.append(f"# HELP {name} {HELP.get(metric, metric)}")
+        lines.append(f"# TYPE {name} histogram")
+        for (m, labels), h in sorted(histograms.items()):
+            if m != metric:
+                continue
+            for bound, n in zip(BUCKETS, h):
+                lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', bound)])} {n}")
+            lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {h[-1]}")
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {h[-2]}")
+            lines.append(f"{name}_count{_fmt_labels(labels)} {h[-1]}")
+    for metric in sorted({m for m, _ in counters}):
+        name = f"{PREFIX}_{metric}"
+        lines.append(f"# HELP {name} {HELP.get(metric, metric)}")
+        lines.append(f"# TYPE {name} counter")
+        for (m, labels), value in sorted(counters.items()):
+            if m == metric:
+                lines.append(f"{name}{_fmt_labels(labels)} {value}")
+    return '\n'.join(lines) + '\n'
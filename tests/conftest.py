@@ -0,0 +1,43 @@
+"""Shared fixtures: a Flask test client with R2 stubbed out, and a marker."""
+import io
+import re
+
+import pytest
+
+import app as appmod
+from bench.corpus import gerber_dxf
+
+GAUGE = {'sts10': '28', 'rows10': '40'}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Test client over a private upload folder; R2 keys "uploaded" are
+    recorded in ``client.uploaded``."""
+    uploaded = []
+    monkeypatch.setattr(appmod, 'UPLOAD_FOLDER', tmp_path)
+    monkeypatch.setattr(appmod, 'r2_upload', lambda key, fileobj: uploaded.append(key))
+    monkeypatch.setattr(appmod, 'r2_exists', lambda key: key in uploaded)
+    client = appmod.app.test_client()
+    client.uploaded = uploaded
+    return client
+
+
+@pytest.fixture(scope='session')
+def marker(tmp_path_factory):
+    """Bytes of a small three-piece LINE/ARC marker."""
+    path = tmp_path_factory.mktemp('marker') / 'marker.dxf'
+    gerber_dxf(path, pieces=3, points=12, layers=3)
+    return path.read_bytes()
+
+
+@pytest.fixture
+def upload(client):
+    """POST /convert with *data*; returns the session id."""
+    def post(data, **form):
+        resp = client.post('/convert', data={
+            'dxf_file': (io.BytesIO(data), 'marker.dxf'), 'units': 'mm', **GAUGE, **form},
+            content_type='multipart/form-data')
+        assert resp.status_code == 200
+        return re.search(rb'name="session_id" value="([0-9a-f]+)"', resp.data).group(1).decode()
+    return post
@@ -0,0 +1,63 @@
+"""Batch conversion and its skip cache."""
+import shutil
+
+import batch
+import dxf2txt
+from bench.corpus import gerber_dxf
+
+
+def test_identical_inputs_and_repeated_gauges_convert_once(tmp_path):
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'b').mkdir()
+    gerber_dxf(tmp_path / 'a' / 'm.dxf', pieces=2, points=12, layers=2)
+    shutil.copy(tmp_path / 'a' / 'm.dxf', tmp_path / 'b' / 'copy.dxf')
+    inputs = batch.find_inputs([str(tmp_path / 'a'), str(tmp_path / 'b')])
+    gauges = [(28.0, 40.0), (28.0, 40.0), (5.0, 7.0)]
+    manifest = batch.run_batch(inputs, gauges, tmp_path / 'out', workers=1)
+    assert manifest['counts'] == {'converted': 2, 'cached': 4, 'failed': 0}
+    by_gauge = {}
+    for entry in manifest['entries']:
+        assert entry['outputs']
+        by_gauge.setdefault(entry['sts10'], set()).add(tuple(entry['outputs']))
+    # every entry at a gauge points at the one conversion
+    assert all(len(outputs) == 1 for outputs in by_gauge.values())
+
+    again = batch.run_batch(inputs, gauges, tmp_path / 'out', workers=1)
+    assert again['counts'] == {'converted': 0, 'cached': 6, 'failed': 0}
+
+
+def _marker(tmp_path):
+    gerber_dxf(tmp_path / 'm.dxf', pieces=3, points=12, layers=3)
+    return batch.find_inputs([str(tmp_path / 'm.dxf')])
+
+
+def test_rasterizer_version_invalidates_the_cache(tmp_path, monkeypatch):
+    inputs = _marker(tmp_path)
+    first = batch.run_batch(inputs, [(28.0, 40.0)], tmp_path / 'out', workers=1)
+    assert first['counts']['converted'] == 1
+    monkeypatch.setattr(dxf2txt, 'GRID_VERSION', dxf2txt.GRID_VERSION + 1)
+    again = batch.run_batch(inputs, [(28.0, 40.0)], tmp_path / 'out', workers=1)
+    assert again['counts'] == {'converted': 1, 'cached': 0, 'failed': 0}
+
+
+def test_failed_piece_fails_the_task_and_is_not_cached(tmp_path, monkeypatch):
+    inputs = _marker(tmp_path)
+    convert_piece = dxf2txt._convert_piece
+
+    def flaky(job):
+        if job[0] == 2:
+            return None, "ValueError: outline too thin"
+        return convert_piece(job)
+
+    # the pool forks, so workers see the patched function
+    monkeypatch.setattr(dxf2txt, '_convert_piece', flaky)
+    manifest = batch.run_batch(inputs, [(28.0, 40.0)], tmp_path / 'out', workers=1)
+    entry, = manifest['entries']
+    assert entry['status'] == 'failed'
+    assert 'piece 2 (' in entry['error'] and 'outline too thin' in entry['error']
+    assert len(entry['outputs']) == 2
+    assert not list((tmp_path / 'out' / '.cache').glob('*.json'))
+
+    monkeypatch.setattr(dxf2txt, '_convert_piece', convert_piece)
+    again = batch.run_batch(inputs, [(28.0, 40.0)], tmp_path / 'out', workers=1)
+    assert again['counts'] == {'converted': 1, 'cached': 0, 'failed': 0}
@@ -0,0 +1,50 @@
+"""HATCH boundary paths read as closed outlines."""
+import math
+
+import ezdxf
+import pytest
+
+import dxf2txt
+
+
+def _hatch_doc(add_path):
+    doc = ezdxf.new()
+    hatch = doc.modelspace().add_hatch(dxfattribs={'layer': 'PIECE'})
+    add_path(hatch)
+    return doc
+
+
+def _area(doc):
+    shapes = dxf2txt.collect_polygons(doc)
+    assert len(shapes) == 1
+    return shapes[0][1].area
+
+
+def test_polyline_path_with_bulge():
+    # 10 x 10 square whose top edge bulges out into a half circle
+    doc = _hatch_doc(lambda h: h.paths.add_polyline_path(
+        [(0, 0, 0), (10, 0, 0), (10, 10, 1), (0, 10, 0)], is_closed=True))
+    expected = 100 + math.pi * 25 / 2
+    assert _area(doc) == pytest.approx(expected, rel=0.03)
+
+
+def test_edge_path_with_lines_and_arc():
+    def add(h):
+        path = h.paths.add_edge_path()
+        path.add_line((0, 0), (10, 0))
+        path.add_line((10, 0), (10, 10))
+        # counter-clockwise half circle from (10, 10) back to (0, 10)
+        path.add_arc((5, 10), 5, 0, 180, ccw=True)
+        path.add_line((0, 10), (0, 0))
+    expected = 100 + math.pi * 25 / 2
+    assert _area(_hatch_doc(add)) == pytest.approx(expected, rel=0.03)
+
+
+def test_hatch_with_hole():
+    def add(h):
+        h.paths.add_polyline_path([(0, 0), (20, 0), (20, 20), (0, 20)], is_closed=True,
+                                  flags=ezdxf.const.BOUNDARY_PATH_EXTERNAL)
+        h.paths.add_polyline_path([(5, 5), (15, 5), (15, 15), (5, 15)], is_closed=True)
+    # boundary paths are separate outlines, like every other closed entity
+    shapes = dxf2txt.collect_polygons(_hatch_doc(add))
+    assert [round(poly.area, -1) for _, poly in sorted(shapes, key=lambda s: s[1].area)] == [100, 400]
@@ -0,0 +1,96 @@
+"""In-process job queue: depth bound, time budget and expiry."""
+import threading
+import time
+
+import pytest
+
+import jobs
+
+
+def _wait_for(queue, job_id, *statuses, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.status(job_id)
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} stuck in {queue.status(job_id)['status']}")
+
+
+@pytest.fixture
+def gate():
+    event = threading.Event()
+    yield event
+    event.set()  # never leave pool threads blocked
+
+
+def test_runs_jobs_and_reports_results():
+    queue = jobs.make_queue('inprocess', workers=2)
+    done = queue.submit(lambda a, b: a + b, 2, b=3)
+    failed = queue.submit(lambda: 1 / 0)
+    assert _wait_for(queue, done, 'done')['result'] == 5
+    assert _wait_for(queue, failed, 'failed')['error'].startswith('ZeroDivisionError')
+    assert queue.status('nope') is None
+
+
+def test_queue_full(gate):
+    queue = jobs.InProcessQueue(workers=1, max_queued=1)
+    running = queue.submit(gate.wait)
+    queue.submit(gate.wait)
+    with pytest.raises(jobs.QueueFull):
+        queue.submit(gate.wait)
+    gate.set()
+    _wait_for(queue, running, 'done')
+    queue.submit(lambda: None)
+
+
+def test_running_job_past_budget_times_out_but_keeps_its_slot(gate):
+    queue = jobs.InProcessQueue(workers=1, max_queued=0, time_budget=0.05)
+    job_id = queue.submit(gate.wait)
+    _wait_for(queue, job_id, 'running')
+    time.sleep(0.1)
+    job = queue.status(job_id)
+    assert (job['status'], job['error']) == ('timeout', "Time budget exceeded")
+    # the thread is still busy, so the pool has no room yet
+    with pytest.raises(jobs.QueueFull):
+        queue.submit(lambda: None)
+    gate.set()
+    deadline = time.time() + 5
+    while True:
+        try:
+            queue.submit(lambda: None)
+            break
+        except jobs.QueueFull:
+            assert time.time() < deadline
+            time.sleep(0.01)
+    # the late result is discarded
+    job = queue.status(job_id)
+    assert job['status'] == 'timeout' and job['result'] is None
+
+
+def test_queued_job_expires(gate):
+    queue = jobs.InProcessQueue(workers=1, max_queued=1, time_budget=0.05)
+    running = queue.submit(gate.wait)
+    waiting = queue.submit(lambda: 'never')
+    time.sleep(0.1)
+    job = queue.status(waiting)
+    assert (job['status'], job['error']) == ('timeout', "Waited too long in queue")
+    gate.set()
+    _wait_for(queue, running, 'timeout')
+    time.sleep(0.05)
+    assert queue.status(waiting)['result'] is None
+
+
+def test_keeps_the_newest_finished_jobs():
+    queue = jobs.InProcessQueue(workers=1, keep=2)
+    ids = [queue.submit(lambda i=i: i) for i in range(4)]
+    for job_id in ids:
+        _wait_for(queue, job_id, 'done')
+    queue.submit(lambda: None)
+    assert queue.status(ids[0]) is None and queue.status(ids[1]) is None
+    assert queue.status(ids[3])['result'] == 3
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        jobs.make_queue('celery')
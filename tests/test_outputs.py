@@ -0,0 +1,130 @@
+"""DAK outputs: golden files per stitch mode, concurrent writes, reuse and
+versioning."""
+import io
+import threading
+import zipfile
+from pathlib import Path
+
+import pytest
+from shapely.geometry import box
+
+import app as appmod
+import dxf2txt
+
+GAUGE = {'sts10': '28', 'rows10': '40'}
+GOLDEN = Path(__file__).parent / 'data' / 'dak'
+
+# Golden files in tests/data/dak were written by the original per-mode
+# writer; the row strategies must reproduce them byte for byte.
+GOLDEN_RUNS = [
+    [(2, 5)],
+    [(1, 7)],
+    [(0, 4), (6, 3)],
+    [(0, 2), (4, 1), (7, 3)],
+    [],
+    [(3, 6)],
+    [(0, 10)],
+    [(5, 1)],
+    [(1, 3), (5, 4)],
+]
+GOLDEN_MODES = {
+    'plain': ({}, 28, 40, 4),
+    'plain_yarn7': ({}, 18.5, 24, 7),
+    'garter': ({'garter_mode': True}, 28, 40, 4),
+    'garter_transfers': ({'garter_mode': True, 'add_transfers': True}, 28, 40, 4),
+    'full_cardigan': ({'full_cardigan': True}, 28, 40, 4),
+    'half_cardigan': ({'half_cardigan': True}, 28, 40, 4),
+}
+
+
+@pytest.mark.parametrize('as_grid', [False, True], ids=['runs', 'grid'])
+@pytest.mark.parametrize('mode', sorted(GOLDEN_MODES))
+def test_writer_matches_golden_file(mode, as_grid, tmp_path):
+    options, sts10, rows10, yarn = GOLDEN_MODES[mode]
+    runs = dxf2txt.StitchGrid.from_runs(GOLDEN_RUNS) if as_grid else GOLDEN_RUNS
+    path = tmp_path / f"{mode}.txt"
+    dxf2txt._write_shape(path, 'Front Piece', 'Front_Piece', runs, sts10, rows10,
+                         yarn=yarn, **options)
+    assert path.read_bytes() == (GOLDEN / f"{mode}.txt").read_bytes()
+
+
+def test_concurrent_writers_of_one_file(tmp_path):
+    grid = dxf2txt.scanline_grid(box(0, 0, 200, 300), 28, 40)
+    path = tmp_path / '1_P.txt'
+    errors = []
+
+    def write():
+        try:
+            for _ in range(20):
+                dxf2txt._write_shape(path, 'P', 'P', grid, 28, 40)
+                grid.save(tmp_path / 'grid.npz')
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=write) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert path.read_text().endswith('END\n')
+    # no temp files left behind
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['1_P.txt', 'grid.npz']
+
+
+def _dak_files(tmp_path, session_id):
+    return {p: p.stat().st_mtime_ns for p in (tmp_path / session_id).glob('out_*/*.txt')}
+
+
+def test_convert_all_reuses_existing_files(client, upload, marker, tmp_path):
+    session_id = upload(marker)
+    form = {'session_id': session_id, 'unit_scale': '1.0', **GAUGE}
+    first = zipfile.ZipFile(io.BytesIO(client.post('/convert_all', data=form).data))
+    written = _dak_files(tmp_path, session_id)
+    assert len(written) == len(first.namelist()) == 3
+
+    again = zipfile.ZipFile(io.BytesIO(client.post('/convert_all', data=form).data))
+    assert again.namelist() == first.namelist()
+    assert _dak_files(tmp_path, session_id) == written
+
+    # /convert_shape with the same settings serves the same file
+    resp = client.post('/convert_shape', data={**form, 'piece_index': '2'})
+    assert resp.status_code == 200
+    assert _dak_files(tmp_path, session_id) == written
+
+
+def test_outputs_are_keyed_by_code_version(client, upload, marker, tmp_path, monkeypatch):
+    session_id = upload(marker)
+    form = {'session_id': session_id, 'unit_scale': '1.0', 'piece_index': '1', **GAUGE}
+    client.post('/convert_shape', data=form)
+    sprites = {k for k in client.uploaded if '0_previews_' in k}
+    dak = {k for k in client.uploaded if k.endswith('.txt')}
+
+    monkeypatch.setattr(dxf2txt, 'GRID_VERSION', dxf2txt.GRID_VERSION + 1)
+    monkeypatch.setattr(appmod, 'PREVIEW_VERSION', appmod.PREVIEW_VERSION + 1)
+    assert upload(marker) == session_id
+    client.post('/convert_shape', data=form)
+    assert len({k for k in client.uploaded if '0_previews_' in k} - sprites) == 1
+    assert len({k for k in client.uploaded if k.endswith('.txt')} - dak) == 1
+    assert len(list((tmp_path / session_id).glob('out_*'))) == 2
+
+
+def test_convert_all_lists_failed_pieces(client, upload, marker, monkeypatch):
+    session_id = upload(marker)
+    convert_shape = dxf2txt._convert_shape
+
+    def flaky(name, base_poly, out_dir, piece_index, *args, **kwargs):
+        if piece_index == 2:
+            raise ValueError("outline too thin")
+        return convert_shape(name, base_poly, out_dir, piece_index, *args, **kwargs)
+
+    monkeypatch.setattr(dxf2txt, '_convert_shape', flaky)
+    form = {'session_id': session_id, 'unit_scale': '1.0', 'pieces': '1,2,9', **GAUGE}
+    archive = zipfile.ZipFile(io.BytesIO(client.post('/convert_all', data=form).data))
+    names = archive.namelist()
+    assert names[-1] == 'errors.txt'
+    assert [n for n in names if n.startswith('1_')] and not [n for n in names if n.startswith('2_')]
+    errors = archive.read('errors.txt').decode().splitlines()
+    assert len(errors) == 2
+    assert errors[0].startswith('piece 2 (') and errors[0].endswith('ValueError: outline too thin')
+    assert errors[1] == 'piece 9: Shape not found'
@@ -0,0 +1,70 @@
+"""/preview_shape: strong ETags, conditional GET and the spill cache."""
+import pytest
+
+import app as appmod
+import config
+
+
+@pytest.fixture
+def preview_cache(monkeypatch):
+    monkeypatch.setattr(appmod, '_preview_lru', appmod.OrderedDict())
+    monkeypatch.setattr(appmod, '_preview_bytes', 0)
+    return appmod._preview_lru
+
+
+def _url(session_id, **params):
+    query = {'session_id': session_id, 'piece_index': 1, 'rotation': 90,
+             'mirror': 'left', 'unit_scale': '1.0', **params}
+    return '/preview_shape?' + '&'.join(f"{k}={v}" for k, v in query.items())
+
+
+def test_etag_and_conditional_get(client, upload, marker, preview_cache):
+    url = _url(upload(marker))
+    first = client.get(url)
+    assert first.status_code == 200 and first.mimetype == 'image/svg+xml'
+    etag = first.headers['ETag']
+    assert etag.startswith('"') and not etag.startswith('W/')
+    assert first.headers['Cache-Control'] == f"public, max-age={config.PREVIEW_MAX_AGE}"
+    again = client.get(url)
+    assert again.headers['ETag'] == etag and again.data == first.data
+
+    for validator in (etag, f"W/{etag}", f'"other", {etag}'):
+        resp = client.get(url, headers={'If-None-Match': validator})
+        assert resp.status_code == 304
+        assert resp.data == b''
+        assert resp.headers['ETag'] == etag
+        assert resp.headers['Cache-Control'] == first.headers['Cache-Control']
+        assert 'Content-Type' not in resp.headers
+
+    stale = client.get(url, headers={'If-None-Match': '"other"'})
+    assert stale.status_code == 200 and stale.data == first.data
+
+
+def test_etag_follows_parameters(client, upload, marker, preview_cache):
+    session_id = upload(marker)
+    etags = {client.get(_url(session_id, **params)).headers['ETag']
+             for params in ({}, {'rotation': 0}, {'mirror': 'none'}, {'piece_index': 2},
+                            {'json': 1}, {'lod': 100}, {'sts10': 5, 'rows10': 7})}
+    assert len(etags) == 7
+
+
+def test_spilled_preview_is_promoted_back_to_memory(client, upload, marker, preview_cache,
+                                                    monkeypatch, tmp_path):
+    session_id = upload(marker)
+    monkeypatch.setattr(config, 'PREVIEW_CACHE_BYTES', 1)
+    first = client.get(_url(session_id, piece_index=1))
+    client.get(_url(session_id, piece_index=2))
+    etag = first.headers['ETag'].strip('"')
+    assert etag not in preview_cache
+    assert (tmp_path / session_id / f"preview_{etag}.bin").exists()
+
+    hit = client.get(_url(session_id, piece_index=1))
+    assert hit.data == first.data and hit.mimetype == first.mimetype
+    assert etag in preview_cache
+
+
+def test_not_modified_response_carries_only_validators():
+    resp = appmod.preview_response(b'', None, 'abc', status=304)
+    assert resp.status_code == 304
+    assert 'Content-Type' not in resp.headers and 'Content-Length' not in resp.headers
+    assert resp.headers['ETag'] == '"abc"' and 'max-age' in resp.headers['Cache-Control']
@@ -0,0 +1,164 @@
+"""R2 uploads against a local HTTP stub standing in for the bucket."""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import app as appmod
+import config
+import metrics
+
+
+class _Bucket(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so pooled connections show up
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        # S3 CreateMultipartUpload: this bucket rejects it
+        self.server.posts.append(self.path)
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self._reply(403)
+
+    def do_PUT(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        with server.lock:
+            server.in_flight += 1
+            server.peak = max(server.peak, server.in_flight)
+            server.peers.add(self.client_address)
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+        if 'fail' in self.path:
+            return self._reply(500)
+        server.objects[self.path] = body
+        self._reply(200)
+
+    def do_HEAD(self):
+        self.server.heads.append(self.path)
+        if self.headers.get('Authorization') != f"Bearer {config.CLOUDFLARE_API_TOKEN}":
+            return self._reply(403)
+        self._reply(200 if self.path in self.server.objects else 404)
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Bucket)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.objects, server.peers, server.posts, server.heads = {}, set(), [], []
+    server.in_flight = server.peak = 0
+    server.delay = 0.1
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setattr(config, 'CLOUDFLARE_R2_API_BASE', base)
+    monkeypatch.setattr(config, 'CLOUDFLARE_API_TOKEN', 'token')
+    monkeypatch.setattr(appmod, '_r2_known', appmod.OrderedDict())
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _files(tmp_path, names):
+    items = []
+    for name in names:
+        path = tmp_path / name.replace('/', '_')
+        path.write_bytes(name.encode() * 100)
+        items.append((name, path))
+    return items
+
+
+def test_upload_many_is_concurrent_over_pooled_connections(bucket, tmp_path):
+    items = _files(tmp_path, [f"s/{i}.txt" for i in range(2 * config.R2_UPLOAD_WORKERS)])
+    appmod.r2_upload_many(items)
+    assert set(bucket.objects) == {f"/{key}" for key, _ in items}
+    assert bucket.objects['/s/0.txt'] == b's/0.txt' * 100
+    assert bucket.peak > 1
+    # more uploads than workers, yet no more connections than the pool holds
+    assert len(bucket.peers) <= config.R2_UPLOAD_WORKERS
+
+
+def test_failed_put_is_reraised(bucket, tmp_path):
+    items = _files(tmp_path, ['s/a.txt', 's/fail.txt', 's/b.txt'])
+    with pytest.raises(requests.HTTPError):
+        appmod.r2_upload_many(items)
+    # the other uploads still completed, and the failure is not remembered
+    assert {'/s/a.txt', '/s/b.txt'} <= set(bucket.objects)
+    assert 's/fail.txt' not in appmod._r2_known
+
+
+def test_exists_follows_authenticated_head(bucket, tmp_path):
+    bucket.objects['/s/present.txt'] = b'x'
+    assert appmod.r2_exists('s/present.txt')
+    assert not appmod.r2_exists('s/missing.txt')
+    # a known key is answered locally
+    assert appmod.r2_exists('s/present.txt')
+    assert bucket.heads == ['/s/present.txt', '/s/missing.txt']
+
+
+def test_known_keys_are_bounded(bucket, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'R2_KNOWN_KEYS', 2)
+    appmod.r2_upload_many(_files(tmp_path, ['s/a.txt', 's/b.txt']))
+    assert appmod.r2_exists('s/a.txt')  # now the most recently used
+    appmod.r2_upload_many(_files(tmp_path, ['s/c.txt']))
+    assert list(appmod._r2_known) == ['s/a.txt', 's/c.txt']
+
+
+def test_existing_objects_are_not_uploaded_again(bucket, tmp_path):
+    bucket.objects['/s/a.txt'] = b'old'
+    appmod.r2_upload_many(_files(tmp_path, ['s/a.txt', 's/b.txt']))
+    assert bucket.objects['/s/a.txt'] == b'old'
+    assert bucket.objects['/s/b.txt'] == b's/b.txt' * 100
+
+
+def _large_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'R2_MULTIPART_THRESHOLD', 1024)
+    path = tmp_path / 'big.dxf'
+    path.write_bytes(bytes(range(256)) * 64)
+    return path
+
+
+def test_large_file_without_s3_keys_uses_one_put(bucket, tmp_path, monkeypatch):
+    path = _large_file(tmp_path, monkeypatch)
+    monkeypatch.setattr(config, 'R2_MULTIPART_ENABLED', False)
+    monkeypatch.setattr(appmod, '_r2_multipart_upload', None)  # must not be reached
+    appmod.r2_upload_many([('s/big.dxf', path)])
+    assert bucket.objects['/s/big.dxf'] == path.read_bytes()
+
+
+def test_rejected_multipart_falls_back_to_one_put(bucket, tmp_path, monkeypatch):
+    pytest.importorskip('boto3')
+    path = _large_file(tmp_path, monkeypatch)
+    monkeypatch.setattr(config, 'R2_MULTIPART_ENABLED', True)
+    monkeypatch.setattr(config, 'CLOUDFLARE_R2_ENDPOINT', config.CLOUDFLARE_R2_API_BASE)
+    monkeypatch.setattr(config, 'CLOUDFLARE_BUCKET', 'bucket')
+    monkeypatch.setattr(config, 'R2_ACCESS_KEY_ID', 'key')
+    monkeypatch.setattr(config, 'R2_SECRET_ACCESS_KEY', 'secret')
+    monkeypatch.setattr(appmod, '_s3_client', None)
+    appmod.r2_upload_many([('s/big.dxf', path)])
+    assert bucket.posts  # the S3 API was tried first
+    assert bucket.objects['/s/big.dxf'] == path.read_bytes()
+
+
+def test_upload_spans_reach_the_request_breakdown(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, 'enabled', True)
+    monkeypatch.setattr(appmod, '_r2_known', appmod.OrderedDict())
+    monkeypatch.setattr(appmod, 'r2_exists', lambda key: False)
+    monkeypatch.setattr(appmod, 'r2_upload', lambda key, fileobj: time.sleep(0.01))
+    metrics.begin_request()
+    try:
+        appmod.r2_upload_many(_files(tmp_path, ['s/a.txt', 's/b.txt']))
+        appmod.r2_upload_bytes_async('s/c.svg', b'<svg/>').result()
+    finally:
+        stages = dict(metrics.end_request())
+    assert stages['r2_upload'] >= 0.03
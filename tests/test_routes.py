@@ -0,0 +1,40 @@
+"""Request validation on the conversion routes."""
+import io
+
+import pytest
+
+import dxf2txt
+
+BAD_GAUGES = [('0', '40'), ('28', '0'), ('-5', '7'), ('28', '-1'), ('nan', '40'),
+              ('inf', '40'), ('x', '40')]
+
+
+@pytest.mark.parametrize('sts10,rows10', BAD_GAUGES)
+def test_convert_rejects_bad_gauge(client, marker, sts10, rows10):
+    resp = client.post('/convert', data={
+        'dxf_file': (io.BytesIO(marker), 'marker.dxf'), 'units': 'mm',
+        'sts10': sts10, 'rows10': rows10}, content_type='multipart/form-data')
+    assert resp.status_code == 400
+
+
+@pytest.mark.parametrize('route', ['/convert_shape', '/convert_all'])
+@pytest.mark.parametrize('sts10,rows10', BAD_GAUGES)
+def test_conversions_reject_bad_gauge(client, upload, marker, route, sts10, rows10):
+    session_id = upload(marker)
+    resp = client.post(route, data={'session_id': session_id, 'unit_scale': '1.0',
+                                    'piece_index': '1', 'sts10': sts10, 'rows10': rows10})
+    assert resp.status_code == 400
+
+
+@pytest.mark.parametrize('sts10,rows10', [('-5', '7'), ('28', '-1'), ('nan', '0'), ('inf', '40')])
+def test_preview_rejects_bad_gauge(client, upload, marker, sts10, rows10):
+    session_id = upload(marker)
+    resp = client.get(f"/preview_shape?session_id={session_id}&piece_index=1"
+                      f"&sts10={sts10}&rows10={rows10}")
+    assert resp.status_code == 400
+
+
+@pytest.mark.parametrize('sts10,rows10', [(0, 40), (28, -1), (float('nan'), 7)])
+def test_gauge_fidelity_rejects_bad_gauge(sts10, rows10):
+    with pytest.raises(ValueError, match='gauge must be positive'):
+        dxf2txt.gauge_fidelity(sts10, rows10)
@@ -0,0 +1,111 @@
+"""Parity of the edge-table rasterizer with the shapely reference, and of
+the raster-space mirror with the geometric one."""
+import random
+
+import pytest
+import shapely
+from shapely.affinity import rotate, scale
+from shapely.geometry import MultiPolygon, Polygon
+
+import dxf2txt
+from bench.corpus import build_corpus, garment_outline
+
+GAUGES = [(28.0, 40.0), (18.0, 24.0), (5.0, 7.0)]
+ROTATIONS = [0, 30, 90, 135, 270]
+
+
+def _outlines():
+    rng = random.Random(0)
+    bodice = Polygon(garment_outline(0, 0, 400, 600, 120, rng))
+    sleeve = Polygon(garment_outline(500, 0, 250, 450, 60, rng))
+    # a pocket opening and a buttonhole cut out of the bodice
+    holed = Polygon(bodice.exterior.coords, [
+        [(100, 100), (180, 100), (180, 160), (100, 160)],
+        [(250, 300), (262, 300), (262, 340), (250, 340)],
+    ])
+    return {
+        'bodice': bodice,
+        'holes': holed,
+        'multi': MultiPolygon([bodice, sleeve]),
+    }
+
+
+@pytest.fixture(scope='module')
+def corpus_outlines(tmp_path_factory):
+    corpus = build_corpus(tmp_path_factory.mktemp('corpus'), 'small')
+    return [poly for path in corpus.values()
+            for _, poly in dxf2txt.list_shapes(str(path))]
+
+
+def _assert_parity(poly, sts10, rows10):
+    ref = list(dxf2txt.row_stitch_counts(poly, sts10, rows10))
+    assert dxf2txt.scanline_stitch_counts(poly, sts10, rows10) == ref
+
+
+@pytest.mark.parametrize('sts10,rows10', GAUGES)
+@pytest.mark.parametrize('angle', ROTATIONS)
+@pytest.mark.parametrize('name', ['bodice', 'holes', 'multi'])
+def test_matches_reference(name, angle, sts10, rows10):
+    poly = rotate(_outlines()[name], angle, origin='centroid')
+    _assert_parity(poly, sts10, rows10)
+
+
+@pytest.mark.parametrize('sts10,rows10', GAUGES)
+def test_matches_reference_on_corpus(corpus_outlines, sts10, rows10):
+    assert corpus_outlines
+    for poly in corpus_outlines:
+        for angle in (0, 90):
+            _assert_parity(rotate(poly, angle, origin='centroid'), sts10, rows10)
+
+
+def _geometry_mirror_grid(poly, sts10, rows10, mirror, heal):
+    """The union + closing that mirrored_grid replaced (kept in bench/run.py)."""
+    minx, miny, maxx, maxy = poly.bounds
+    axis = minx if mirror == 'left' else maxx
+    mirrored = scale(poly, xfact=-1, yfact=1, origin=(axis, (miny + maxy) / 2))
+    joined = shapely.union_all([poly, mirrored]).buffer(heal).buffer(-heal)
+    return dxf2txt.scanline_grid(joined, sts10, rows10)
+
+
+def _spans(runs):
+    """Runs as (start, end) stitch spans, joining runs at most a stitch apart."""
+    spans = []
+    for indent, count in runs:
+        if spans and indent - spans[-1][1] <= 1:
+            spans[-1][1] = indent + count
+        else:
+            spans.append([indent, indent + count])
+    return spans
+
+
+def _allowed_difference(raster, geometric, row, rows):
+    """The ways mirrored_grid may legitimately differ from the geometric path:
+    - at the seam the geometric union can round into two abutting runs where
+      the raster gives one, and either edge may round one stitch apart;
+    - the closing buffer erodes the outline's very first and last rows,
+      which the raster keeps."""
+    if not geometric and row in (0, rows - 1):
+        return True
+    a, b = _spans(raster), _spans(geometric)
+    return len(a) == len(b) and all(abs(p - q) <= 1 for sa, sb in zip(a, b)
+                                    for p, q in zip(sa, sb))
+
+
+def test_mirrored_grid_matches_geometric_mirror(corpus_outlines):
+    total = differing = 0
+    for poly in corpus_outlines:
+        for angle in (0, 90, 135):
+            poly_r = rotate(poly, angle, origin='centroid')
+            for sts10, rows10 in GAUGES:
+                heal = dxf2txt.gauge_fidelity(sts10, rows10).heal
+                for mirror in ('left', 'right'):
+                    raster = dxf2txt.mirrored_grid(poly_r, sts10, rows10, mirror, heal).runs()
+                    geometric = _geometry_mirror_grid(poly_r, sts10, rows10, mirror, heal).runs()
+                    assert len(raster) == len(geometric)
+                    for row, (a, b) in enumerate(zip(raster, geometric)):
+                        total += 1
+                        if a != b:
+                            differing += 1
+                            assert _allowed_difference(a, b, row, len(raster)), (row, a, b)
+    # the rounding cases above are rare: well under 0.1% of rows
+    assert differing <= total // 1000
@@ -0,0 +1,84 @@
+"""LINE chains welded into closed outlines."""
+import math
+
+import ezdxf
+import pytest
+from shapely.geometry import LineString, MultiLineString, Polygon
+from shapely.ops import linemerge
+
+import dxf2txt
+
+GAUGES = [(28.0, 40.0), (10.0, 14.0), (5.0, 7.0), (3.0, 4.0)]
+
+
+def _circle(n=200, r=10.0):
+    return [(r * math.cos(math.tau * i / n), r * math.sin(math.tau * i / n))
+            for i in range(n)]
+
+
+def _bodice(step=0.5):
+    """400 × 600 mm bodice whose armhole is a quarter ellipse in *step* mm chords."""
+    n = int(math.ceil(0.25 * math.pi * (100 + 120) / 2 / step))
+    arm = [(400 - 100 * math.sin(math.pi / 2 * i / n),
+            360 + 120 * (1 - math.cos(math.pi / 2 * i / n))) for i in range(n + 1)]
+    return [(0, 0), (400, 0)] + arm + [(300, 600), (0, 600)]
+
+
+def _lines(pts, jitter=0.0):
+    """Closed LINE chain through *pts*; every third start is nudged by *jitter*."""
+    n = len(pts)
+    return [((pts[i][0] + jitter * (i % 3), pts[i][1]), pts[(i + 1) % n])
+            for i in range(n)]
+
+
+def _doc(lines):
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+    for start, end in lines:
+        msp.add_line(start, end, dxfattribs={'layer': 'PIECE'})
+    return doc
+
+
+def test_fine_chain_keeps_its_shape_at_a_coarse_weld():
+    segs = [LineString(line) for line in _lines(_circle(), jitter=1e-4)]
+    welded, gaps = dxf2txt._weld_segments(segs, 0.7)
+    assert gaps == 133
+    merged = linemerge(MultiLineString(welded))
+    assert merged.is_ring
+    assert Polygon(merged).area == pytest.approx(Polygon(_circle()).area, rel=1e-3)
+
+
+def test_gap_below_tol_is_closed():
+    pts = _circle()
+    lines = _lines(pts)
+    lines[-1] = (lines[-1][0], (pts[0][0], pts[0][1] - 0.03))
+    shapes = dxf2txt.collect_polygons(_doc(lines))
+    assert len(shapes) == 1
+
+
+@pytest.mark.parametrize('sts10,rows10', GAUGES)
+@pytest.mark.parametrize('outline', [_circle(), _bodice()], ids=['circle', 'bodice'])
+def test_finely_segmented_outline_survives_coarse_gauges(outline, sts10, rows10):
+    fidelity = dxf2txt.gauge_fidelity(sts10, rows10)
+    shapes = dxf2txt.collect_polygons(_doc(_lines(outline, jitter=1e-4)), fidelity=fidelity)
+    assert len(shapes) == 1
+    expected = Polygon(outline)
+    # simplification may shave the outline by its tolerance, never more
+    slack = expected.length * (fidelity.simplify + dxf2txt.TOL)
+    assert abs(shapes[0][1].area - expected.area) <= slack
+
+
+def test_weld_distance_does_not_follow_the_gauge():
+    for sts10, rows10 in GAUGES:
+        assert dxf2txt.gauge_fidelity(sts10, rows10).weld == dxf2txt.TOL
+    assert dxf2txt.gauge_fidelity(5, 7).scaled(25.4).weld == pytest.approx(dxf2txt.TOL / 25.4)
+
+
+def test_heal_rings_drops_rings_without_three_distinct_vertices():
+    rings = [('a', [(0, 0), (0, 0), (1, 1)]),
+             ('b', [(0, 0), (1, 1), (0, 0), (1, 1)]),
+             ('c', [(0, 0), (0, 0), (10, 0), (10, 0), (10, 10), (0, 0)])]
+    healed = dxf2txt.heal_rings(rings)
+    assert [layer for layer, _ in healed] == ['c']
+    # grown by TOL all round
+    assert healed[0][1].area == pytest.approx(50, rel=0.05)